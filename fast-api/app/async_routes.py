@@ -0,0 +1,427 @@
+"""Async (asyncpg + AsyncSession) versions of the API routes.
+
+Mounted under /async next to the sync routes so both modes can be load-tested
+side by side on the same process and hardware. Handlers mirror the single-item
+CRUD and query routes of app.main; bulk endpoints are sync only and list
+endpoints return JSON only (no NDJSON/CSV streaming). Status lookups share the
+in-process status cache with the sync routes, taken as a snapshot from the
+get_statuses dependency so a reload never blocks the event loop.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import List, Literal, Optional
+
+from app.database import get_async_autocommit_db, get_async_db
+from app import models, schemas
+from app.errors import integrity_http_error
+from app.pagination import NEXT_CURSOR_HEADER, keyset_page, split_page
+from app.queries import (
+    SEARCH_MAX_LIMIT,
+    TASK_COLUMNS,
+    TASK_ORDERING,
+    USER_COLUMNS,
+    USER_ORDERINGS,
+    task_filters,
+    task_search,
+    user_search,
+)
+from app.response_cache import cached, invalidates
+from app.serialization import json_rows
+from app.status_cache import Statuses, get_statuses
+
+router = APIRouter(prefix="/async", tags=["async"])
+
+
+async def _get_or_404(db: AsyncSession, model, object_id: int, detail: str):
+    obj = await db.get(model, object_id)
+    if not obj:
+        raise HTTPException(status_code=404, detail=detail)
+    return obj
+
+
+def _check_status(statuses: Statuses, status_id: int) -> None:
+    if statuses.name(status_id) is None:
+        raise HTTPException(status_code=404, detail="Status not found")
+
+
+async def _write_one(db: AsyncSession, statement, detail: str):
+    """Run a single write ... RETURNING statement and return its row as a dict"""
+    try:
+        row = (await db.execute(statement)).first()
+    except IntegrityError as e:
+        raise integrity_http_error(e)
+    if row is None:
+        raise HTTPException(status_code=404, detail=detail)
+    return row._asdict()
+
+
+async def _json_result(db: AsyncSession, statement):
+    """Run a select and return its rows through the fast JSON path"""
+    result = await db.execute(statement)
+    return json_rows(result, result.keys())
+
+
+def _update_or_select(model, object_id: int, values: dict, columns):
+    # An empty body has nothing to write, so just read the row back
+    if not values:
+        return select(*columns).where(model.id == object_id)
+    return update(model).where(model.id == object_id).values(**values)\
+        .returning(*columns).execution_options(synchronize_session=False)
+
+
+# User endpoints
+@router.post("/users", response_model=schemas.User, status_code=201, dependencies=[invalidates("users")])
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_autocommit_db)):
+    """Create a new user"""
+    statement = insert(models.User).values(**user.model_dump()).returning(*USER_COLUMNS)
+    return await _write_one(db, statement, "User not found")
+
+
+@router.get("/users", response_model=List[schemas.User], dependencies=[cached("users")])
+async def get_users(
+    skip: int = 0,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+    order_by: Literal["id", "email"] = "id",
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get all users, paged by cursor (or by skip for older clients)"""
+    ordering = USER_ORDERINGS[order_by]
+    statement = keyset_page(select(*USER_COLUMNS), ordering, f"users:{order_by}", limit, cursor, skip)
+    result = await db.execute(statement)
+    users, next_cursor = split_page(result, ordering, f"users:{order_by}", limit)
+    return json_rows(users, result.keys(), next_cursor)
+
+
+@router.get("/users/{user_id:int}", response_model=schemas.User, dependencies=[cached("users")])
+async def get_user(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Get a specific user by ID"""
+    return await _get_or_404(db, models.User, user_id, "User not found")
+
+
+@router.put("/users/{user_id:int}", response_model=schemas.User, dependencies=[invalidates("users")])
+async def update_user(
+    user_id: int,
+    user_update: schemas.UserUpdate,
+    db: AsyncSession = Depends(get_async_autocommit_db)
+):
+    """Update username or email (corresponds to update_username.sql)"""
+    statement = _update_or_select(models.User, user_id, user_update.model_dump(exclude_unset=True), USER_COLUMNS)
+    return await _write_one(db, statement, "User not found")
+
+
+@router.get("/users/search", response_model=List[schemas.UserSearchResult], dependencies=[cached("users")])
+async def search_users(
+    q: str = Query(..., min_length=3, description="Substring to look for, case-insensitive (at least 3 characters)"),
+    field: Literal["email", "username", "any"] = "email",
+    limit: int = Query(20, ge=1, le=SEARCH_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Substring search on users, best trigram matches first"""
+    criterion, rank = user_search(q, field)
+    ordering = [(rank, True), (models.User.id, False)]
+    key = f"users:search:{field}:{q}"
+    statement = keyset_page(select(*USER_COLUMNS, rank).where(criterion), ordering, key, limit, cursor)
+    result = await db.execute(statement)
+    rows, next_cursor = split_page(result, ordering, key, limit)
+    return json_rows(rows, result.keys(), next_cursor)
+
+
+@router.get("/users/search/by-email", response_model=List[schemas.User], dependencies=[cached("users")])
+async def find_users_by_email(
+    pattern: str = Query(..., description="Email pattern to search (e.g., '%@example.com')"),
+    limit: int = Query(SEARCH_MAX_LIMIT, ge=1, le=SEARCH_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Find users with specific email pattern (corresponds to find_users.sql)"""
+    ordering = USER_ORDERINGS["id"]
+    statement = keyset_page(
+        select(*USER_COLUMNS).where(models.User.email.like(pattern)), ordering, "users:by-email", limit, cursor
+    )
+    result = await db.execute(statement)
+    users, next_cursor = split_page(result, ordering, "users:by-email", limit)
+    return json_rows(users, result.keys(), next_cursor)
+
+
+@router.get(
+    "/users/without-tasks",
+    response_model=List[schemas.User],
+    dependencies=[cached("users", "tasks")],
+)
+async def get_users_without_tasks(db: AsyncSession = Depends(get_async_db)):
+    """Get users who have no tasks (corresponds to users_no_tasks.sql)"""
+    statement = select(*USER_COLUMNS).outerjoin(models.Task).where(models.Task.id == None)
+    return await _json_result(db, statement)
+
+
+@router.get(
+    "/users/with-task-count",
+    response_model=List[schemas.UserWithTaskCount],
+    dependencies=[cached("users", "tasks")],
+)
+async def get_users_with_task_count(
+    response: Response,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get users and their task count (corresponds to users_task_count.sql), read from the per-user counters"""
+    ordering = USER_ORDERINGS["id"]
+    statement = select(
+        models.User.id,
+        models.User.username,
+        func.coalesce(models.UserTaskCount.task_count, 0).label("task_count")
+    ).outerjoin(models.UserTaskCount)
+    results, next_cursor = split_page(
+        (await db.execute(keyset_page(statement, ordering, "users:task-count", limit, cursor))).all(),
+        ordering, "users:task-count", limit
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return [{"username": username, "task_count": count} for _, username, count in results]
+
+
+@router.get(
+    "/users/with-in-progress-tasks",
+    response_model=List[schemas.UserWithInProgressTask],
+    dependencies=[cached("users", "tasks", "statuses")],
+)
+async def get_users_with_in_progress_tasks(
+    db: AsyncSession = Depends(get_async_db),
+    statuses: Statuses = Depends(get_statuses)
+):
+    """Get users and their tasks with 'in progress' status (corresponds to users_in_progress.sql)"""
+    try:
+        status_ids = statuses.select(include=["in progress"])
+    except KeyError:
+        raise HTTPException(status_code=404, detail="In progress status not found")
+    statement = select(
+        models.User.username,
+        models.Task.title,
+        models.Task.description,
+        literal("in progress").label("status")
+    ).join(models.Task, models.User.id == models.Task.user_id)\
+     .where(*task_filters(status_ids=status_ids))
+
+    return await _json_result(db, statement)
+
+
+@router.get(
+    "/users/{user_id:int}/tasks",
+    response_model=List[schemas.Task],
+    dependencies=[cached("users", "tasks")],
+)
+async def get_user_tasks(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Get all tasks for a specific user (corresponds to user_tasks.sql)"""
+    await _get_or_404(db, models.User, user_id, "User not found")
+    return await _json_result(db, select(*TASK_COLUMNS).where(*task_filters(user_id=user_id)))
+
+
+# Status endpoints
+@router.get("/statuses", response_model=List[schemas.Status], dependencies=[cached("statuses")])
+async def get_all_statuses(statuses: Statuses = Depends(get_statuses)):
+    """Get all statuses (served from the status cache)"""
+    return statuses.all()
+
+
+# Task endpoints
+@router.post("/tasks", response_model=schemas.Task, status_code=201, dependencies=[invalidates("tasks")])
+async def create_task(
+    task: schemas.TaskCreate,
+    db: AsyncSession = Depends(get_async_autocommit_db),
+    statuses: Statuses = Depends(get_statuses)
+):
+    """Add a new task (corresponds to add_task.sql)"""
+    _check_status(statuses, task.status_id)
+    statement = insert(models.Task).values(**task.model_dump()).returning(*TASK_COLUMNS)
+    return await _write_one(db, statement, "Task not found")
+
+
+@router.get("/tasks", response_model=List[schemas.Task], dependencies=[cached("tasks", "users", "statuses")])
+async def get_tasks(
+    user_id: Optional[int] = Query(None, description="Only tasks of this user"),
+    status: Optional[List[str]] = Query(None, description="Only tasks with one of these status names (repeatable)"),
+    exclude_status: Optional[List[str]] = Query(None, description="Leave out tasks with these status names (repeatable)"),
+    has_description: Optional[bool] = Query(None, description="true: only tasks with a description; false: only without"),
+    domain: Optional[str] = Query(None, description="Only tasks of users with this email domain ('example.com')"),
+    skip: int = 0,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+    db: AsyncSession = Depends(get_async_db),
+    statuses: Statuses = Depends(get_statuses)
+):
+    """Get tasks matching every given filter, paged by cursor (or by skip for older clients)"""
+    try:
+        status_ids = statuses.select(status, exclude_status)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Status not found")
+    criteria = task_filters(user_id, status_ids, has_description, domain)
+    statement = keyset_page(select(*TASK_COLUMNS).where(*criteria), TASK_ORDERING, "tasks:id", limit, cursor, skip)
+    result = await db.execute(statement)
+    tasks, next_cursor = split_page(result, TASK_ORDERING, "tasks:id", limit)
+    return json_rows(tasks, result.keys(), next_cursor)
+
+
+@router.get(
+    "/tasks/search",
+    response_model=List[schemas.TaskSearchResult],
+    dependencies=[cached("tasks", "statuses")],
+)
+async def search_tasks(
+    q: str = Query(..., max_length=200, description="Words to find in task titles and descriptions"),
+    prefix: bool = Query(True, description='Match word prefixes; false reads q as a web search ("a phrase", or, -word)'),
+    status: Optional[str] = Query(None, description="Only tasks with this status name"),
+    user_id: Optional[int] = Query(None, description="Only tasks of this user"),
+    order: Literal["rank", "newest"] = Query(
+        "rank", description="rank: best matches first; newest: latest tasks first, fast however many tasks match"
+    ),
+    limit: int = Query(20, ge=1, le=SEARCH_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+    db: AsyncSession = Depends(get_async_db),
+    statuses: Statuses = Depends(get_statuses)
+):
+    """Full-text search on task titles and descriptions, best matches or newest first"""
+    search = task_search(q, prefix)
+    if search is None:
+        raise HTTPException(status_code=422, detail="q has no words to search for")
+    criterion, rank = search
+    criteria = [criterion]
+    if status is not None:
+        status_id = statuses.id(status)
+        if status_id is None:
+            raise HTTPException(status_code=404, detail="Status not found")
+        criteria.append(models.Task.status_id == status_id)
+    if user_id is not None:
+        criteria.append(models.Task.user_id == user_id)
+    ordering = [(rank, True), (models.Task.id, False)] if order == "rank" else [(models.Task.id, True)]
+    key = f"tasks:search:{order}:{prefix}:{status}:{user_id}:{q}"
+    statement = keyset_page(select(*TASK_COLUMNS, rank).where(*criteria), ordering, key, limit, cursor)
+    result = await db.execute(statement)
+    rows, next_cursor = split_page(result, ordering, key, limit)
+    return json_rows(rows, result.keys(), next_cursor)
+
+
+@router.get(
+    "/tasks/{task_id:int}",
+    response_model=schemas.TaskWithDetails,
+    dependencies=[cached("tasks", "users", "statuses")],
+)
+async def get_task(task_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Get a specific task by ID with details"""
+    statement = select(models.Task).options(
+        joinedload(models.Task.user),
+        joinedload(models.Task.status)
+    ).where(models.Task.id == task_id)
+
+    task = (await db.scalars(statement)).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
+
+@router.put("/tasks/{task_id:int}", response_model=schemas.Task, dependencies=[invalidates("tasks")])
+async def update_task(
+    task_id: int,
+    task_update: schemas.TaskUpdate,
+    db: AsyncSession = Depends(get_async_autocommit_db),
+    statuses: Statuses = Depends(get_statuses)
+):
+    """Update a task"""
+    update_data = task_update.model_dump(exclude_unset=True)
+    if "status_id" in update_data:
+        _check_status(statuses, update_data["status_id"])
+
+    statement = _update_or_select(models.Task, task_id, update_data, TASK_COLUMNS)
+    return await _write_one(db, statement, "Task not found")
+
+
+@router.patch("/tasks/{task_id:int}/status", response_model=schemas.Task, dependencies=[invalidates("tasks")])
+async def update_task_status(
+    task_id: int,
+    status_update: schemas.TaskStatusUpdate,
+    db: AsyncSession = Depends(get_async_autocommit_db),
+    statuses: Statuses = Depends(get_statuses)
+):
+    """Update status of a specific task (corresponds to update_status.sql)"""
+    _check_status(statuses, status_update.status_id)
+    statement = _update_or_select(models.Task, task_id, {"status_id": status_update.status_id}, TASK_COLUMNS)
+    return await _write_one(db, statement, "Task not found")
+
+
+@router.delete("/tasks/{task_id:int}", status_code=204, dependencies=[invalidates("tasks")])
+async def delete_task(task_id: int, db: AsyncSession = Depends(get_async_autocommit_db)):
+    """Delete a specific task (corresponds to delete_task.sql)"""
+    statement = delete(models.Task).where(models.Task.id == task_id)\
+        .returning(models.Task.id).execution_options(synchronize_session=False)
+    await _write_one(db, statement, "Task not found")
+    return None
+
+
+@router.get(
+    "/tasks/by-status/{status_name}",
+    response_model=List[schemas.Task],
+    dependencies=[cached("tasks", "statuses")],
+)
+async def get_tasks_by_status(
+    status_name: str,
+    db: AsyncSession = Depends(get_async_db),
+    statuses: Statuses = Depends(get_statuses)
+):
+    """Get tasks by specific status (corresponds to tasks_by_status.sql)"""
+    status_id = statuses.id(status_name)
+    if status_id is None:
+        raise HTTPException(status_code=404, detail="Status not found")
+
+    return await _json_result(db, select(*TASK_COLUMNS).where(*task_filters(status_ids=[status_id])))
+
+
+@router.get(
+    "/tasks/incomplete",
+    response_model=List[schemas.Task],
+    dependencies=[cached("tasks", "statuses")],
+)
+async def get_incomplete_tasks(db: AsyncSession = Depends(get_async_db), statuses: Statuses = Depends(get_statuses)):
+    """Get all tasks that are not completed yet (corresponds to incomplete_tasks.sql)"""
+    try:
+        status_ids = statuses.select(exclude=["completed"])
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Completed status not found")
+
+    return await _json_result(db, select(*TASK_COLUMNS).where(*task_filters(status_ids=status_ids)))
+
+
+@router.get("/tasks/no-description", response_model=List[schemas.Task], dependencies=[cached("tasks")])
+async def get_tasks_without_description(db: AsyncSession = Depends(get_async_db)):
+    """Get tasks without description (corresponds to tasks_no_description.sql)"""
+    return await _json_result(db, select(*TASK_COLUMNS).where(*task_filters(has_description=False)))
+
+
+@router.get("/tasks/by-domain", response_model=List[schemas.Task], dependencies=[cached("tasks", "users")])
+async def get_tasks_by_email_domain(
+    domain: str = Query(..., description="Email domain to filter (e.g., '@example.com' or 'example.com')"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get tasks for users with specific email domain (corresponds to tasks_by_domain.sql)"""
+    return await _json_result(db, select(*TASK_COLUMNS).where(*task_filters(domain=domain)))
+
+
+# Statistics endpoints
+@router.get(
+    "/stats/tasks-by-status",
+    response_model=List[schemas.TaskCountByStatus],
+    dependencies=[cached("tasks", "statuses")],
+)
+async def get_task_count_by_status(db: AsyncSession = Depends(get_async_db)):
+    """Get task count for each status (corresponds to count_by_status.sql), read from the per-status counters"""
+    statement = select(
+        models.Status.name,
+        func.coalesce(models.StatusTaskCount.task_count, 0).label("task_count")
+    ).outerjoin(models.StatusTaskCount).order_by(models.Status.id)
+
+    results = await db.execute(statement)
+    return [{"name": name, "task_count": count} for name, count in results]
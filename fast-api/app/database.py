@@ -1,8 +1,21 @@
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 
+from app.pool import (
+    InstrumentedAsyncQueuePool,
+    InstrumentedQueuePool,
+    asyncpg_connect_args,
+    engine_options,
+    psycopg2_connect_args,
+)
+from app.replicas import REPLICA_CONNECT_TIMEOUT, REPLICA_HOSTS, REPLICA_MAX_LAG_SECONDS, ReplicaSet, reads_from_primary
+from app.slow_queries import SlowQueryLog
+
 POSTGRES_USER = os.getenv("POSTGRES_USER", "postgres")
 POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "postgres")
 POSTGRES_HOST = os.getenv("POSTGRES_HOST", "db")
@@ -10,10 +23,32 @@ POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
 POSTGRES_DB = os.getenv("POSTGRES_DB", "task_db")
 
 DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
-engine = create_engine(DATABASE_URL)
+engine = create_engine(
+    DATABASE_URL,
+    connect_args=psycopg2_connect_args(),
+    **engine_options(InstrumentedQueuePool)
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args=asyncpg_connect_args(),
+    **engine_options(InstrumentedAsyncQueuePool)
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+replicas = ReplicaSet.from_hosts(
+    REPLICA_HOSTS,
+    lambda host, port: f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{host}:{port}/{POSTGRES_DB}",
+    connect_args={**psycopg2_connect_args(), "connect_timeout": REPLICA_CONNECT_TIMEOUT},
+    **engine_options(InstrumentedQueuePool)
+)
+
+slow_query_log = SlowQueryLog(DATABASE_URL)
+slow_query_log.install(engine, async_engine.sync_engine, *replicas.engines)
+
 Base = declarative_base()
 
 
@@ -25,3 +60,60 @@ def get_db():
     finally:
         db.close()
 
+
+def get_read_db(request: Request):
+    """Dependency for read-only handlers: a session on a healthy replica, or on
+    the primary when none is usable or the client wrote within its
+    read-your-writes window"""
+    replica = None if reads_from_primary(request.cookies) else replicas.choose()
+    if replica is None:
+        yield from get_db()
+        return
+
+    db = replica.sessionmaker()
+    try:
+        # Connect now, so an unreachable replica falls back before the handler runs
+        db.connection()
+    except OperationalError as e:
+        db.close()
+        replica.mark_down(e.orig)
+        yield from get_db()
+        return
+    request.state.max_staleness = REPLICA_MAX_LAG_SECONDS
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_autocommit_db():
+    """Dependency for single-statement writes: each statement commits on its own,
+    saving the BEGIN and COMMIT round trips"""
+    db = SessionLocal()
+    try:
+        db.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    """Dependency for getting an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_autocommit_db():
+    """Async counterpart of get_autocommit_db"""
+    async with AsyncSessionLocal() as db:
+        await db.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+        yield db
+
+
+def pool_stats() -> dict:
+    """Live checkout/idle/overflow counts and wait times for each engine's pool"""
+    return {
+        "sync": engine.pool.stats(),
+        "async": async_engine.sync_engine.pool.stats(),
+        "replicas": replicas.stats(),
+    }
@@ -0,0 +1,33 @@
+"""Mapping of database constraint violations to API errors.
+
+Write endpoints no longer SELECT before writing; they issue the statement and
+let Postgres enforce uniqueness and foreign keys. The constraint a violation
+names tells us which 400/404 to return.
+"""
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+
+CONSTRAINT_ERRORS = {
+    "ix_users_email": (400, "Email already registered"),
+    "tasks_user_id_fkey": (404, "User not found"),
+    "tasks_status_id_fkey": (404, "Status not found"),
+}
+
+
+def constraint_name(error: IntegrityError) -> Optional[str]:
+    """Name of the violated constraint, from psycopg2 or asyncpg errors"""
+    diag = getattr(error.orig, "diag", None)
+    if diag is not None:
+        return diag.constraint_name
+    return getattr(error.orig.__cause__, "constraint_name", None)
+
+
+def integrity_http_error(error: IntegrityError) -> Exception:
+    """The HTTPException for a known constraint, else the original error"""
+    mapped = CONSTRAINT_ERRORS.get(constraint_name(error))
+    if mapped is None:
+        return error
+    status_code, detail = mapped
+    return HTTPException(status_code=status_code, detail=detail)
@@ -0,0 +1,196 @@
+"""Per-route request metrics.
+
+MetricsMiddleware gives every request a RequestStats in a context variable.
+Engine events add each SQL statement and its duration to it, and the JSON
+response paths (app.serialization) add their encoding time. The variable is
+inherited by the threadpool (sync handlers) and by the async engine's
+greenlets, so both routers are covered. When the response is complete, the
+totals are recorded against the route template (``/tasks/{task_id}``, not the
+raw path) with the latency and the body size, and exported by GET /metrics in
+the Prometheus text format.
+
+The cost per request is a context variable, a few clock reads and one
+histogram update per metric, so it stays on in production. Metrics are kept
+per worker process, like the pool and cache statistics.
+
+With DB_QUERY_COUNT_HEADER=true each response also carries its statement
+count in the X-DB-Queries header, which the load benchmark reads. The header
+is sent before a streamed (NDJSON/CSV) body, so it does not count statements
+issued while streaming; the metrics do.
+"""
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+from starlette.routing import Match
+
+from app.metrics import FINE_BUCKETS, Exposition, Histogram
+
+QUERY_COUNT_HEADER = "X-DB-Queries"
+QUERY_COUNT_ENABLED = os.getenv("DB_QUERY_COUNT_HEADER", "false").lower() == "true"
+
+# Label for requests that match no route (404s), so clients cannot inflate the series count
+UNMATCHED = "<unmatched>"
+
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+class RequestStats:
+    __slots__ = ("scope", "statements", "db_seconds", "serialization_seconds")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.serialization_seconds = 0.0
+
+
+class RouteMetrics:
+    """Everything recorded for one method and route template"""
+
+    __slots__ = ("latency", "statements", "db_time", "serialization", "size", "responses")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.db_time = Histogram(FINE_BUCKETS)
+        self.serialization = Histogram(FINE_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+        self.responses: Dict[int, int] = {}
+
+    def observe(self, status: int, seconds: float, size: int, stats: RequestStats) -> None:
+        self.latency.observe(seconds)
+        self.statements.observe(stats.statements)
+        self.db_time.observe(stats.db_seconds)
+        self.serialization.observe(stats.serialization_seconds)
+        self.size.observe(size)
+        self.responses[status] = self.responses.get(status, 0) + 1
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+# Keyed by (method, route template); only touched from the event loop
+_routes: Dict[Tuple[str, str], RouteMetrics] = {}
+
+
+# Engine events
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _request_stats.get() is not None:
+        conn.info["instrumentation_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_stats.get()
+    start = conn.info.pop("instrumentation_start", None)
+    if stats is not None and start is not None:
+        stats.statements += 1
+        stats.db_seconds += time.perf_counter() - start
+
+
+def install(*engines) -> None:
+    """Time statements executed through ``engines`` (sync Engine objects)"""
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def record_serialization(seconds: float) -> None:
+    """Add response encoding time to the current request, if any"""
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.serialization_seconds += seconds
+
+
+def current_route() -> Optional[str]:
+    """"METHOD /route/{template}" of the request being handled, if any"""
+    stats = _request_stats.get()
+    if stats is None:
+        return None
+    return f"{stats.scope['method']} {route_template(stats.scope)}"
+
+
+# Middleware
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path_format
+    # Requests answered before routing (cache hits, rate limiting) and
+    # non-API routes such as /docs are matched here
+    partial = UNMATCHED
+    for candidate in scope["app"].router.routes:
+        match, _ = candidate.matches(scope)
+        if match == Match.FULL:
+            return getattr(candidate, "path_format", UNMATCHED)
+        if match == Match.PARTIAL and partial == UNMATCHED:
+            partial = getattr(candidate, "path_format", UNMATCHED)
+    return partial
+
+
+class MetricsMiddleware:
+    """Records RouteMetrics for every HTTP request (pure ASGI, so streamed bodies are timed to the last chunk)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        stats = RequestStats(scope)
+        token = _request_stats.set(stats)
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if QUERY_COUNT_ENABLED:
+                    message["headers"] = [
+                        *message.get("headers", ()),
+                        (QUERY_COUNT_HEADER.lower().encode(), str(stats.statements).encode()),
+                    ]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            key = (scope["method"], route_template(scope))
+            metrics = _routes.get(key)
+            if metrics is None:
+                metrics = _routes[key] = RouteMetrics()
+            metrics.observe(status, time.perf_counter() - start, size, stats)
+
+
+# Export
+
+def collect(exposition: Exposition) -> None:
+    """Write every route's metrics into ``exposition``"""
+    routes = sorted(_routes.items())
+
+    exposition.family("http_requests_total", "counter", "Responses by route and status code")
+    for (method, path), metrics in routes:
+        for status, count in sorted(metrics.responses.items()):
+            exposition.sample("http_requests_total", {"method": method, "route": path, "status": status}, count)
+
+    histograms = (
+        ("http_request_duration_seconds", "latency", "Time from request to the last body byte"),
+        ("http_request_db_statements", "statements", "SQL statements executed per request"),
+        ("http_request_db_seconds", "db_time", "Time spent executing SQL per request"),
+        ("http_response_serialization_seconds", "serialization", "Time spent encoding JSON bodies per request"),
+        ("http_response_size_bytes", "size", "Response body size"),
+    )
+    for name, attribute, help in histograms:
+        exposition.family(name, "histogram", help)
+        for (method, path), metrics in routes:
+            exposition.histogram(name, {"method": method, "route": path}, getattr(metrics, attribute).snapshot())
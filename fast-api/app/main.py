@@ -1,65 +1,125 @@
-from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi import FastAPI, Body, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, or_
-from typing import List
-import time
-from collections import defaultdict
-import os
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from typing import List, Literal, Optional
+from contextlib import asynccontextmanager
+import logging
+import math
+
+from app.database import (
+    async_engine,
+    engine,
+    get_autocommit_db,
+    get_db,
+    get_read_db,
+    pool_stats,
+    replicas,
+    slow_query_log,
+)
+from app.metrics import Exposition
+from app import instrumentation, models, schemas
+from app.async_routes import router as async_router
+from app.rate_limit import RateLimiter
+from app.replicas import ReadYourWritesMiddleware
+from app.response_cache import cached, invalidates, response_cache
+from app.status_cache import status_cache
+from app.task_changes import task_changes
+from app.errors import integrity_http_error
+from app.queries import (
+    BULK_MAX_ITEMS,
+    SEARCH_MAX_LIMIT,
+    TASK_COLUMNS,
+    TASK_ORDERING,
+    USER_COLUMNS,
+    USER_ORDERINGS,
+    existing_ids,
+    id_in,
+    task_filters,
+    task_search,
+    user_search,
+)
+from app.pagination import NEXT_CURSOR_HEADER, keyset_page, split_page
+from app.serialization import TimedJSONResponse, json_rows
+from app.streaming import stream_format, stream_rows
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        status_cache.refresh()
+    except SQLAlchemyError:
+        logger.warning("Could not load statuses at startup; loading on first use", exc_info=True)
+    # Connects in the background and keeps retrying, so startup never waits on it
+    task_changes.start()
+    yield
+    await task_changes.stop()
+    # Graceful shutdown: close pooled connections instead of leaving them to time out
+    engine.dispose()
+    await async_engine.dispose()
+    replicas.dispose()
 
-from app.database import get_db
-from app import models, schemas
 
 app = FastAPI(
     title="Task Management API",
     description="FastAPI application with PostgreSQL for task management",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=TimedJSONResponse,
 )
 
-# CORS middleware
+
+# Response cache middleware (added before rate limiting so cache hits still count against the limit)
+@app.middleware("http")
+async def response_cache_middleware(request: Request, call_next):
+    return await response_cache.handle(request, call_next)
+
+
+# Rate limiting middleware
+rate_limiter = RateLimiter()
+
+
+@app.middleware("http")
+async def rate_limit_middleware(request: Request, call_next):
+    client_ip = request.client.host if request.client else "unknown"
+    retry_after = rate_limiter.hit(client_ip)
+    if retry_after is not None:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": f"Rate limit exceeded. Max {rate_limiter.calls} requests per {rate_limiter.period} seconds."},
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+    response = await call_next(request)
+    return response
+
+
+# Reads after a client's own write go to the primary for a while (see app.replicas)
+if replicas.replicas:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+
+# CORS middleware; outside the response cache and rate limiter, so cache hits
+# and 429s carry the CORS headers too
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 
-# Rate limiting middleware
-class RateLimiter:
-    def __init__(self, calls: int = None, period: int = None):
-        self.calls = calls or int(os.getenv("RATE_LIMIT_CALLS", "100"))
-        self.period = period or int(os.getenv("RATE_LIMIT_PERIOD", "60"))
-        self.requests = defaultdict(list)
-    
-    async def __call__(self, request: Request):
-        client_ip = request.client.host
-        now = time.time()
-        
-        self.requests[client_ip] = [
-            req_time for req_time in self.requests[client_ip]
-            if now - req_time < self.period
-        ]
-        
-        # Check rate limit
-        if len(self.requests[client_ip]) >= self.calls:
-            raise HTTPException(
-                status_code=429,
-                detail=f"Rate limit exceeded. Max {self.calls} requests per {self.period} seconds."
-            )
-        
-        self.requests[client_ip].append(now)
-
-
-rate_limiter = RateLimiter()
+# Per-route metrics; outermost so cache hits and throttled requests are measured too
+instrumentation.install(engine, async_engine.sync_engine, *replicas.engines)
+app.add_middleware(instrumentation.MetricsMiddleware)
 
 
-@app.middleware("http")
-async def rate_limit_middleware(request: Request, call_next):
-    await rate_limiter(request)
-    response = await call_next(request)
-    return response
+app.include_router(async_router)
 
 
 @app.get("/")
@@ -76,30 +136,61 @@ async def health_check():
     return {"status": "healthy"}
 
 
-# User endpoints
-@app.post("/users", response_model=schemas.User, status_code=201)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    """Create a new user"""
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
-    if db_user:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    
-    db_user = models.User(**user.model_dump())
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+@app.get("/metrics/pool")
+async def get_pool_metrics():
+    """Connection pool usage and checkout wait-time histograms"""
+    return pool_stats()
+
+
+@app.get("/metrics/cache")
+async def get_cache_metrics():
+    """Response cache hit/miss/304 counters and memory use for this worker"""
+    return response_cache.stats()
+
+
+@app.get("/metrics", response_class=Response)
+async def get_metrics():
+    """Per-route latency, SQL, serialization and size metrics, and change feed gauges, in Prometheus text format"""
+    exposition = Exposition()
+    instrumentation.collect(exposition)
+    task_changes.collect(exposition)
+    return Response(exposition.render(), media_type=Exposition.CONTENT_TYPE)
 
 
-@app.get("/users", response_model=List[schemas.User])
-def get_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all users"""
-    users = db.query(models.User).offset(skip).limit(limit).all()
-    return users
+@app.get("/admin/slow-queries")
+async def get_slow_queries(limit: int = Query(20, ge=1, le=1000)):
+    """Recent statements slower than SLOW_QUERY_MS in this worker, newest first, with their plans"""
+    return slow_query_log.recent(limit)
 
 
-@app.get("/users/{user_id}", response_model=schemas.User)
-def get_user(user_id: int, db: Session = Depends(get_db)):
+# User endpoints
+@app.post("/users", response_model=schemas.User, status_code=201, dependencies=[invalidates("users")])
+def create_user(user: schemas.UserCreate, db: Session = Depends(get_autocommit_db)):
+    """Create a new user"""
+    statement = insert(models.User).values(**user.model_dump()).returning(*USER_COLUMNS)
+    try:
+        return db.execute(statement).one()._asdict()
+    except IntegrityError as e:
+        raise integrity_http_error(e)
+
+
+@app.get("/users", response_model=List[schemas.User], dependencies=[cached("users")])
+def get_users(
+    skip: int = 0,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+    order_by: Literal["id", "email"] = "id",
+    db: Session = Depends(get_read_db)
+):
+    """Get all users, paged by cursor (or by skip for older clients)"""
+    ordering = USER_ORDERINGS[order_by]
+    result = db.execute(keyset_page(select(*USER_COLUMNS), ordering, f"users:{order_by}", limit, cursor, skip))
+    users, next_cursor = split_page(result, ordering, f"users:{order_by}", limit)
+    return json_rows(users, result.keys(), next_cursor)
+
+
+@app.get("/users/{user_id:int}", response_model=schemas.User, dependencies=[cached("users")])
+def get_user(user_id: int, db: Session = Depends(get_read_db)):
     """Get a specific user by ID"""
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
@@ -107,122 +198,294 @@ def get_user(user_id: int, db: Session = Depends(get_db)):
     return user
 
 
-@app.put("/users/{user_id}", response_model=schemas.User)
-def update_user(user_id: int, user_update: schemas.UserUpdate, db: Session = Depends(get_db)):
+@app.put("/users/{user_id:int}", response_model=schemas.User, dependencies=[invalidates("users")])
+def update_user(user_id: int, user_update: schemas.UserUpdate, db: Session = Depends(get_autocommit_db)):
     """Update username or email (corresponds to update_username.sql)"""
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+    update_data = user_update.model_dump(exclude_unset=True)
+    if update_data:
+        statement = update(models.User).where(models.User.id == user_id).values(**update_data)\
+            .returning(*USER_COLUMNS).execution_options(synchronize_session=False)
+    else:
+        statement = select(*USER_COLUMNS).where(models.User.id == user_id)
+
+    try:
+        db_user = db.execute(statement).first()
+    except IntegrityError as e:
+        raise integrity_http_error(e)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    update_data = user_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_user, field, value)
-    
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+    return db_user._asdict()
+
+
+@app.get("/users/search", response_model=List[schemas.UserSearchResult], dependencies=[cached("users")])
+def search_users(
+    q: str = Query(..., min_length=3, description="Substring to look for, case-insensitive (at least 3 characters)"),
+    field: Literal["email", "username", "any"] = "email",
+    limit: int = Query(20, ge=1, le=SEARCH_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+    db: Session = Depends(get_read_db)
+):
+    """Substring search on users, best trigram matches first"""
+    criterion, rank = user_search(q, field)
+    ordering = [(rank, True), (models.User.id, False)]
+    key = f"users:search:{field}:{q}"
+    statement = keyset_page(select(*USER_COLUMNS, rank).where(criterion), ordering, key, limit, cursor)
+    result = db.execute(statement)
+    rows, next_cursor = split_page(result, ordering, key, limit)
+    return json_rows(rows, result.keys(), next_cursor)
 
 
-@app.get("/users/search/by-email", response_model=List[schemas.User])
+@app.get("/users/search/by-email", response_model=List[schemas.User], dependencies=[cached("users")])
 def find_users_by_email(
     pattern: str = Query(..., description="Email pattern to search (e.g., '%@example.com')"),
-    db: Session = Depends(get_db)
+    limit: int = Query(SEARCH_MAX_LIMIT, ge=1, le=SEARCH_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+    db: Session = Depends(get_read_db)
 ):
     """Find users with specific email pattern (corresponds to find_users.sql)"""
-    users = db.query(models.User).filter(models.User.email.like(pattern)).all()
-    return users
+    ordering = USER_ORDERINGS["id"]
+    statement = select(*USER_COLUMNS).where(models.User.email.like(pattern))
+    result = db.execute(keyset_page(statement, ordering, "users:by-email", limit, cursor))
+    users, next_cursor = split_page(result, ordering, "users:by-email", limit)
+    return json_rows(users, result.keys(), next_cursor)
 
 
-@app.get("/users/without-tasks", response_model=List[schemas.User])
-def get_users_without_tasks(db: Session = Depends(get_db)):
+@app.get("/users/without-tasks", response_model=List[schemas.User], dependencies=[cached("users", "tasks")])
+def get_users_without_tasks(db: Session = Depends(get_read_db)):
     """Get users who have no tasks (corresponds to users_no_tasks.sql)"""
-    users = db.query(models.User).outerjoin(models.Task).filter(models.Task.id == None).all()
-    return users
+    result = db.execute(select(*USER_COLUMNS).outerjoin(models.Task).where(models.Task.id == None))
+    return json_rows(result, result.keys())
 
 
-@app.get("/users/with-task-count", response_model=List[schemas.UserWithTaskCount])
-def get_users_with_task_count(db: Session = Depends(get_db)):
-    """Get users and their task count (corresponds to users_task_count.sql)"""
-    results = db.query(
+@app.get(
+    "/users/with-task-count",
+    response_model=List[schemas.UserWithTaskCount],
+    dependencies=[cached("users", "tasks")],
+)
+def get_users_with_task_count(
+    response: Response,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+    db: Session = Depends(get_read_db)
+):
+    """Get users and their task count (corresponds to users_task_count.sql), read from the per-user counters"""
+    ordering = USER_ORDERINGS["id"]
+    query = db.query(
+        models.User.id,
         models.User.username,
-        func.count(models.Task.id).label("task_count")
-    ).outerjoin(models.Task).group_by(models.User.id, models.User.username).all()
-    
-    return [{"username": username, "task_count": count} for username, count in results]
+        func.coalesce(models.UserTaskCount.task_count, 0).label("task_count")
+    ).outerjoin(models.UserTaskCount)
+    results, next_cursor = split_page(
+        keyset_page(query, ordering, "users:task-count", limit, cursor).all(), ordering, "users:task-count", limit
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
 
+    return [{"username": username, "task_count": count} for _, username, count in results]
 
-@app.get("/users/with-in-progress-tasks", response_model=List[schemas.UserWithInProgressTask])
-def get_users_with_in_progress_tasks(db: Session = Depends(get_db)):
+
+@app.get(
+    "/users/with-in-progress-tasks",
+    response_model=List[schemas.UserWithInProgressTask],
+    dependencies=[cached("users", "tasks", "statuses")],
+)
+def get_users_with_in_progress_tasks(
+    fmt: Optional[str] = Depends(stream_format),
+    db: Session = Depends(get_read_db)
+):
     """Get users and their tasks with 'in progress' status (corresponds to users_in_progress.sql)"""
-    results = db.query(
+    try:
+        status_ids = status_cache.select(include=["in progress"])
+    except KeyError:
+        raise HTTPException(status_code=404, detail="In progress status not found")
+    statement = select(
         models.User.username,
         models.Task.title,
         models.Task.description,
-        models.Status.name.label("status")
+        literal("in progress").label("status")
     ).join(models.Task, models.User.id == models.Task.user_id)\
-     .join(models.Status, models.Task.status_id == models.Status.id)\
-     .filter(models.Status.name == "in progress").all()
-    
-    return [
-        {
-            "username": username,
-            "title": title,
-            "description": description,
-            "status": status
-        }
-        for username, title, description, status in results
-    ]
-
-
-@app.get("/users/{user_id}/tasks", response_model=List[schemas.Task])
-def get_user_tasks(user_id: int, db: Session = Depends(get_db)):
+     .where(*task_filters(status_ids=status_ids))
+    if fmt:
+        return stream_rows(statement, fmt, db.get_bind())
+
+    result = db.execute(statement)
+    return json_rows(result, result.keys())
+
+
+@app.get(
+    "/users/{user_id:int}/tasks",
+    response_model=List[schemas.Task],
+    dependencies=[cached("users", "tasks")],
+)
+def get_user_tasks(
+    user_id: int,
+    fmt: Optional[str] = Depends(stream_format),
+    db: Session = Depends(get_read_db)
+):
     """Get all tasks for a specific user (corresponds to user_tasks.sql)"""
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    tasks = db.query(models.Task).filter(models.Task.user_id == user_id).all()
-    return tasks
+    criteria = task_filters(user_id=user_id)
+    statement = select(*TASK_COLUMNS).where(*criteria)
+    if fmt:
+        return stream_rows(statement, fmt, db.get_bind())
+
+    result = db.execute(statement)
+    return json_rows(result, result.keys())
 
 
 # Status endpoints
-@app.get("/statuses", response_model=List[schemas.Status])
-def get_statuses(db: Session = Depends(get_db)):
-    """Get all statuses"""
-    statuses = db.query(models.Status).all()
-    return statuses
+@app.get("/statuses", response_model=List[schemas.Status], dependencies=[cached("statuses")])
+def get_statuses():
+    """Get all statuses (served from the status cache)"""
+    return status_cache.all()
+
+
+@app.post("/statuses/refresh", response_model=List[schemas.Status], dependencies=[invalidates("statuses")])
+def refresh_statuses():
+    """Reload the status cache in every worker, e.g. after a migration adds a status"""
+    status_cache.invalidate()
+    return status_cache.all()
 
 
 # Task endpoints
-@app.post("/tasks", response_model=schemas.Task, status_code=201)
-def create_task(task: schemas.TaskCreate, db: Session = Depends(get_db)):
+@app.post("/tasks", response_model=schemas.Task, status_code=201, dependencies=[invalidates("tasks")])
+def create_task(task: schemas.TaskCreate, db: Session = Depends(get_autocommit_db)):
     """Add a new task (corresponds to add_task.sql)"""
-    # Verify user exists
-    user = db.query(models.User).filter(models.User.id == task.user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Verify status exists
-    status = db.query(models.Status).filter(models.Status.id == task.status_id).first()
-    if not status:
+    # Unknown statuses are rejected from the cache; unknown users by the foreign key
+    if status_cache.name(task.status_id) is None:
         raise HTTPException(status_code=404, detail="Status not found")
     
-    db_task = models.Task(**task.model_dump())
-    db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
-    return db_task
-
+    statement = insert(models.Task).values(**task.model_dump()).returning(*TASK_COLUMNS)
+    try:
+        return db.execute(statement).one()._asdict()
+    except IntegrityError as e:
+        raise integrity_http_error(e)
 
-@app.get("/tasks", response_model=List[schemas.Task])
-def get_tasks(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all tasks"""
-    tasks = db.query(models.Task).offset(skip).limit(limit).all()
-    return tasks
 
-
-@app.get("/tasks/{task_id}", response_model=schemas.TaskWithDetails)
-def get_task(task_id: int, db: Session = Depends(get_db)):
+@app.post("/tasks/bulk", response_model=schemas.TaskBulkCreateResult, dependencies=[invalidates("tasks")])
+def create_tasks_bulk(
+    tasks: List[schemas.TaskCreate] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    db: Session = Depends(get_db)
+):
+    """Add many tasks in one transaction; items with unknown user or status are reported, not inserted"""
+    known_users = set(db.scalars(existing_ids(models.User.id, {task.user_id for task in tasks})))
+
+    rows, errors = [], []
+    for index, task in enumerate(tasks):
+        if task.user_id not in known_users:
+            errors.append({"index": index, "detail": "User not found"})
+        elif status_cache.name(task.status_id) is None:
+            errors.append({"index": index, "detail": "Status not found"})
+        else:
+            rows.append(task.model_dump())
+
+    created = []
+    if rows:
+        statement = insert(models.Task).returning(*TASK_COLUMNS, sort_by_parameter_order=True)
+        try:
+            # Executed as batched multi-row INSERT ... VALUES ... RETURNING
+            created = [row._asdict() for row in db.execute(statement, rows)]
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="A referenced user was deleted during the import; retry")
+
+    return {"created": created, "errors": errors}
+
+
+@app.get("/tasks", response_model=List[schemas.Task], dependencies=[cached("tasks", "users", "statuses")])
+def get_tasks(
+    user_id: Optional[int] = Query(None, description="Only tasks of this user"),
+    status: Optional[List[str]] = Query(None, description="Only tasks with one of these status names (repeatable)"),
+    exclude_status: Optional[List[str]] = Query(None, description="Leave out tasks with these status names (repeatable)"),
+    has_description: Optional[bool] = Query(None, description="true: only tasks with a description; false: only without"),
+    domain: Optional[str] = Query(None, description="Only tasks of users with this email domain ('example.com')"),
+    skip: int = 0,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+    db: Session = Depends(get_read_db)
+):
+    """Get tasks matching every given filter, paged by cursor (or by skip for older clients)"""
+    try:
+        status_ids = status_cache.select(status, exclude_status)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Status not found")
+    criteria = task_filters(user_id, status_ids, has_description, domain)
+    statement = select(*TASK_COLUMNS).where(*criteria)
+    result = db.execute(keyset_page(statement, TASK_ORDERING, "tasks:id", limit, cursor, skip))
+    tasks, next_cursor = split_page(result, TASK_ORDERING, "tasks:id", limit)
+    return json_rows(tasks, result.keys(), next_cursor)
+
+
+@app.get("/tasks/changes", response_class=StreamingResponse)
+async def stream_task_changes(
+    request: Request,
+    user_id: Optional[int] = Query(None, description="Only changes to this user's tasks"),
+    last_event_id: Optional[int] = Query(
+        None, description="Resume after this event id (EventSource sends it as the Last-Event-ID header itself)"
+    ),
+):
+    """Server-sent events for every task insert, update, status change and delete"""
+    header = request.headers.get("last-event-id")
+    if header is not None:
+        try:
+            last_event_id = int(header)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+    return StreamingResponse(
+        task_changes.stream(last_event_id, user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get(
+    "/tasks/search",
+    response_model=List[schemas.TaskSearchResult],
+    dependencies=[cached("tasks", "statuses")],
+)
+def search_tasks(
+    q: str = Query(..., max_length=200, description="Words to find in task titles and descriptions"),
+    prefix: bool = Query(True, description='Match word prefixes; false reads q as a web search ("a phrase", or, -word)'),
+    status: Optional[str] = Query(None, description="Only tasks with this status name"),
+    user_id: Optional[int] = Query(None, description="Only tasks of this user"),
+    order: Literal["rank", "newest"] = Query(
+        "rank", description="rank: best matches first; newest: latest tasks first, fast however many tasks match"
+    ),
+    limit: int = Query(20, ge=1, le=SEARCH_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+    db: Session = Depends(get_read_db)
+):
+    """Full-text search on task titles and descriptions, best matches or newest first"""
+    search = task_search(q, prefix)
+    if search is None:
+        raise HTTPException(status_code=422, detail="q has no words to search for")
+    criterion, rank = search
+    criteria = [criterion]
+    if status is not None:
+        status_id = status_cache.id(status)
+        if status_id is None:
+            raise HTTPException(status_code=404, detail="Status not found")
+        criteria.append(models.Task.status_id == status_id)
+    if user_id is not None:
+        criteria.append(models.Task.user_id == user_id)
+    ordering = [(rank, True), (models.Task.id, False)] if order == "rank" else [(models.Task.id, True)]
+    key = f"tasks:search:{order}:{prefix}:{status}:{user_id}:{q}"
+    statement = keyset_page(select(*TASK_COLUMNS, rank).where(*criteria), ordering, key, limit, cursor)
+    result = db.execute(statement)
+    rows, next_cursor = split_page(result, ordering, key, limit)
+    return json_rows(rows, result.keys(), next_cursor)
+
+
+@app.get(
+    "/tasks/{task_id:int}",
+    response_model=schemas.TaskWithDetails,
+    dependencies=[cached("tasks", "users", "statuses")],
+)
+def get_task(task_id: int, db: Session = Depends(get_read_db)):
     """Get a specific task by ID with details"""
     task = db.query(models.Task).options(
         joinedload(models.Task.user),
@@ -234,116 +497,204 @@ def get_task(task_id: int, db: Session = Depends(get_db)):
     return task
 
 
-@app.put("/tasks/{task_id}", response_model=schemas.Task)
-def update_task(task_id: int, task_update: schemas.TaskUpdate, db: Session = Depends(get_db)):
+@app.put("/tasks/{task_id:int}", response_model=schemas.Task, dependencies=[invalidates("tasks")])
+def update_task(task_id: int, task_update: schemas.TaskUpdate, db: Session = Depends(get_autocommit_db)):
     """Update a task"""
-    db_task = db.query(models.Task).filter(models.Task.id == task_id).first()
-    if not db_task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    
     update_data = task_update.model_dump(exclude_unset=True)
     
-    # Verify status exists if status_id is being updated
+    # Verify status exists if status_id is being updated; user_id is checked by the foreign key
     if "status_id" in update_data:
-        status = db.query(models.Status).filter(models.Status.id == update_data["status_id"]).first()
-        if not status:
+        if status_cache.name(update_data["status_id"]) is None:
             raise HTTPException(status_code=404, detail="Status not found")
     
-    # Verify user exists if user_id is being updated
-    if "user_id" in update_data:
-        user = db.query(models.User).filter(models.User.id == update_data["user_id"]).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-    
-    for field, value in update_data.items():
-        setattr(db_task, field, value)
-    
-    db.commit()
-    db.refresh(db_task)
-    return db_task
+    if update_data:
+        statement = update(models.Task).where(models.Task.id == task_id).values(**update_data)\
+            .returning(*TASK_COLUMNS).execution_options(synchronize_session=False)
+    else:
+        statement = select(*TASK_COLUMNS).where(models.Task.id == task_id)
+
+    try:
+        db_task = db.execute(statement).first()
+    except IntegrityError as e:
+        raise integrity_http_error(e)
+    if not db_task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return db_task._asdict()
 
 
-@app.patch("/tasks/{task_id}/status", response_model=schemas.Task)
-def update_task_status(task_id: int, status_update: schemas.TaskStatusUpdate, db: Session = Depends(get_db)):
+@app.patch("/tasks/{task_id:int}/status", response_model=schemas.Task, dependencies=[invalidates("tasks")])
+def update_task_status(
+    task_id: int,
+    status_update: schemas.TaskStatusUpdate,
+    db: Session = Depends(get_autocommit_db)
+):
     """Update status of a specific task (corresponds to update_status.sql)"""
-    db_task = db.query(models.Task).filter(models.Task.id == task_id).first()
-    if not db_task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    
     # Verify status exists
-    status = db.query(models.Status).filter(models.Status.id == status_update.status_id).first()
-    if not status:
+    if status_cache.name(status_update.status_id) is None:
         raise HTTPException(status_code=404, detail="Status not found")
     
-    db_task.status_id = status_update.status_id
+    statement = update(models.Task).where(models.Task.id == task_id)\
+        .values(status_id=status_update.status_id)\
+        .returning(*TASK_COLUMNS).execution_options(synchronize_session=False)
+    try:
+        db_task = db.execute(statement).first()
+    except IntegrityError as e:
+        raise integrity_http_error(e)
+    if not db_task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return db_task._asdict()
+
+
+@app.patch(
+    "/tasks/bulk/status",
+    response_model=schemas.TaskBulkStatusResult,
+    dependencies=[invalidates("tasks")],
+)
+def update_tasks_status_bulk(bulk_update: schemas.TaskBulkStatusUpdate, db: Session = Depends(get_db)):
+    """Move many tasks to a status with one UPDATE ... RETURNING, by id list or by filter.
+
+    Either way at most BULK_MAX_ITEMS tasks change per request. A filter is
+    first resolved to ids with SELECT ... FOR UPDATE, limited to one row over
+    the cap, so a larger match is refused before anything is written.
+    """
+    if status_cache.name(bulk_update.status_id) is None:
+        raise HTTPException(status_code=404, detail="Status not found")
+
+    if bulk_update.task_ids is not None:
+        if len(bulk_update.task_ids) > BULK_MAX_ITEMS:
+            raise HTTPException(status_code=400, detail=f"At most {BULK_MAX_ITEMS} task ids per request")
+        criteria = [id_in(models.Task.id, bulk_update.task_ids)]
+    else:
+        status_id = bulk_update.filter.status_id
+        if status_id is not None and status_cache.name(status_id) is None:
+            raise HTTPException(status_code=404, detail="Status not found")
+        matched = list(db.scalars(
+            select(models.Task.id)
+            .where(*task_filters(bulk_update.filter.user_id, None if status_id is None else [status_id]))
+            .order_by(models.Task.id)
+            .limit(BULK_MAX_ITEMS + 1)
+            .with_for_update()
+        ))
+        if len(matched) > BULK_MAX_ITEMS:
+            db.rollback()
+            raise HTTPException(
+                status_code=413,
+                detail=f"The filter matches more than {BULK_MAX_ITEMS} tasks; narrow it or send task_ids in batches",
+            )
+        # The matched rows stay locked until commit, so they still match the filter
+        criteria = [id_in(models.Task.id, matched)]
+
+    statement = update(models.Task).where(*criteria)\
+        .values(status_id=bulk_update.status_id)\
+        .returning(models.Task.id)\
+        .execution_options(synchronize_session=False)
+    updated = list(db.scalars(statement))
     db.commit()
-    db.refresh(db_task)
-    return db_task
+
+    not_found = []
+    if bulk_update.task_ids is not None:
+        found = set(updated)
+        not_found = [task_id for task_id in dict.fromkeys(bulk_update.task_ids) if task_id not in found]
+    return {"status_id": bulk_update.status_id, "updated": sorted(updated), "not_found": not_found}
 
 
-@app.delete("/tasks/{task_id}", status_code=204)
-def delete_task(task_id: int, db: Session = Depends(get_db)):
+@app.delete("/tasks/{task_id:int}", status_code=204, dependencies=[invalidates("tasks")])
+def delete_task(task_id: int, db: Session = Depends(get_autocommit_db)):
     """Delete a specific task (corresponds to delete_task.sql)"""
-    db_task = db.query(models.Task).filter(models.Task.id == task_id).first()
-    if not db_task:
+    statement = delete(models.Task).where(models.Task.id == task_id)\
+        .returning(models.Task.id).execution_options(synchronize_session=False)
+    if db.execute(statement).first() is None:
         raise HTTPException(status_code=404, detail="Task not found")
-    
-    db.delete(db_task)
-    db.commit()
     return None
 
 
-@app.get("/tasks/by-status/{status_name}", response_model=List[schemas.Task])
-def get_tasks_by_status(status_name: str, db: Session = Depends(get_db)):
+@app.get(
+    "/tasks/by-status/{status_name}",
+    response_model=List[schemas.Task],
+    dependencies=[cached("tasks", "statuses")],
+)
+def get_tasks_by_status(
+    status_name: str,
+    fmt: Optional[str] = Depends(stream_format),
+    db: Session = Depends(get_read_db)
+):
     """Get tasks by specific status (corresponds to tasks_by_status.sql)"""
-    status = db.query(models.Status).filter(models.Status.name == status_name).first()
-    if not status:
+    status_id = status_cache.id(status_name)
+    if status_id is None:
         raise HTTPException(status_code=404, detail="Status not found")
     
-    tasks = db.query(models.Task).filter(models.Task.status_id == status.id).all()
-    return tasks
+    criteria = task_filters(status_ids=[status_id])
+    statement = select(*TASK_COLUMNS).where(*criteria)
+    if fmt:
+        return stream_rows(statement, fmt, db.get_bind())
+
+    result = db.execute(statement)
+    return json_rows(result, result.keys())
 
 
-@app.get("/tasks/incomplete", response_model=List[schemas.Task])
-def get_incomplete_tasks(db: Session = Depends(get_db)):
+@app.get("/tasks/incomplete", response_model=List[schemas.Task], dependencies=[cached("tasks", "statuses")])
+def get_incomplete_tasks(
+    fmt: Optional[str] = Depends(stream_format),
+    db: Session = Depends(get_read_db)
+):
     """Get all tasks that are not completed yet (corresponds to incomplete_tasks.sql)"""
-    completed_status = db.query(models.Status).filter(models.Status.name == "completed").first()
-    if not completed_status:
+    try:
+        status_ids = status_cache.select(exclude=["completed"])
+    except KeyError:
         raise HTTPException(status_code=404, detail="Completed status not found")
-    
-    tasks = db.query(models.Task).filter(models.Task.status_id != completed_status.id).all()
-    return tasks
 
+    criteria = task_filters(status_ids=status_ids)
+    statement = select(*TASK_COLUMNS).where(*criteria)
+    if fmt:
+        return stream_rows(statement, fmt, db.get_bind())
 
-@app.get("/tasks/no-description", response_model=List[schemas.Task])
-def get_tasks_without_description(db: Session = Depends(get_db)):
+    result = db.execute(statement)
+    return json_rows(result, result.keys())
+
+
+@app.get("/tasks/no-description", response_model=List[schemas.Task], dependencies=[cached("tasks")])
+def get_tasks_without_description(
+    fmt: Optional[str] = Depends(stream_format),
+    db: Session = Depends(get_read_db)
+):
     """Get tasks without description (corresponds to tasks_no_description.sql)"""
-    tasks = db.query(models.Task).filter(
-        or_(models.Task.description == None, models.Task.description == "")
-    ).all()
-    return tasks
+    criteria = task_filters(has_description=False)
+    statement = select(*TASK_COLUMNS).where(*criteria)
+    if fmt:
+        return stream_rows(statement, fmt, db.get_bind())
+
+    result = db.execute(statement)
+    return json_rows(result, result.keys())
 
 
-@app.get("/tasks/by-domain", response_model=List[schemas.Task])
+@app.get("/tasks/by-domain", response_model=List[schemas.Task], dependencies=[cached("tasks", "users")])
 def get_tasks_by_email_domain(
-    domain: str = Query(..., description="Email domain to filter (e.g., '@example.com')"),
-    db: Session = Depends(get_db)
+    domain: str = Query(..., description="Email domain to filter (e.g., '@example.com' or 'example.com')"),
+    fmt: Optional[str] = Depends(stream_format),
+    db: Session = Depends(get_read_db)
 ):
     """Get tasks for users with specific email domain (corresponds to tasks_by_domain.sql)"""
-    tasks = db.query(models.Task).join(models.User).filter(
-        models.User.email.like(f"%{domain}")
-    ).all()
-    return tasks
+    criteria = task_filters(domain=domain)
+    statement = select(*TASK_COLUMNS).where(*criteria)
+    if fmt:
+        return stream_rows(statement, fmt, db.get_bind())
+
+    result = db.execute(statement)
+    return json_rows(result, result.keys())
 
 
 # Statistics endpoints
-@app.get("/stats/tasks-by-status", response_model=List[schemas.TaskCountByStatus])
-def get_task_count_by_status(db: Session = Depends(get_db)):
-    """Get task count for each status (corresponds to count_by_status.sql)"""
+@app.get(
+    "/stats/tasks-by-status",
+    response_model=List[schemas.TaskCountByStatus],
+    dependencies=[cached("tasks", "statuses")],
+)
+def get_task_count_by_status(db: Session = Depends(get_read_db)):
+    """Get task count for each status (corresponds to count_by_status.sql), read from the per-status counters"""
     results = db.query(
         models.Status.name,
-        func.count(models.Task.id).label("task_count")
-    ).outerjoin(models.Task).group_by(models.Status.name).all()
+        func.coalesce(models.StatusTaskCount.task_count, 0).label("task_count")
+    ).outerjoin(models.StatusTaskCount).order_by(models.Status.id).all()
     
     return [{"name": name, "task_count": count} for name, count in results]
 
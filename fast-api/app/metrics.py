@@ -0,0 +1,76 @@
+"""Lightweight in-process metric primitives"""
+import threading
+from bisect import bisect_left
+from typing import Sequence
+
+# Seconds; tuned for connection waits and request latencies alike
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram with Prometheus-style cumulative snapshots"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+
+        cumulative, running = {}, 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            running += n
+            cumulative["+Inf" if bound == float("inf") else str(bound)] = running
+        return {"buckets": cumulative, "count": count, "sum": total}
+
+
+# Seconds; for work that usually takes well under a millisecond
+FINE_BUCKETS = (0.0001, 0.00025, 0.0005) + DEFAULT_BUCKETS[:10]
+
+
+class Exposition:
+    """Builds a Prometheus text-format (version 0.0.4) payload"""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4"
+
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name: str, kind: str, help: str) -> None:
+        self.lines.append(f"# HELP {name} {help}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, labels: dict, value: float) -> None:
+        self.lines.append(f"{name}{_labels(labels)} {value}")
+
+    def histogram(self, name: str, labels: dict, snapshot: dict) -> None:
+        """Samples for one Histogram.snapshot() (family declared separately)"""
+        for bound, count in snapshot["buckets"].items():
+            self.sample(f"{name}_bucket", {**labels, "le": bound}, count)
+        self.sample(f"{name}_sum", labels, snapshot["sum"])
+        self.sample(f"{name}_count", labels, snapshot["count"])
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
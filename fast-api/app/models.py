@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
-from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy import BigInteger, Column, Computed, Index, Integer, String, Text, ForeignKey, DateTime
+from sqlalchemy.sql import func, text
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from app.database import Base
 
 
@@ -11,9 +12,18 @@ class User(Base):
     username = Column(String(100), nullable=False)
     email = Column(String(100), nullable=False, unique=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Lower-cased part after the '@', maintained by Postgres for indexed domain lookups
+    email_domain = Column(String(100), Computed("lower(split_part(email, '@', 2))", persisted=True), nullable=False)
 
     tasks = relationship("Task", back_populates="user", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_users_email_domain", "email_domain", "id"),
+        # Trigram indexes for substring / similarity search (pg_trgm)
+        Index("ix_users_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+        Index("ix_users_username_trgm", "username", postgresql_using="gin", postgresql_ops={"username": "gin_trgm_ops"}),
+    )
+
 
 class Status(Base):
     __tablename__ = "status"
@@ -30,9 +40,62 @@ class Task(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(100), nullable=False)
     description = Column(Text, nullable=True)
-    status_id = Column(Integer, ForeignKey("status.id"), nullable=False, index=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    status_id = Column(Integer, ForeignKey("status.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # Weighted title + description lexemes for /tasks/search, maintained by
+    # Postgres; deferred so loading a Task does not fetch it
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('english'::regconfig, title), 'A') || "
+            "setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'B')",
+            persisted=True,
+        ),
+        nullable=False,
+    ))
 
     user = relationship("User", back_populates="tasks")
     status = relationship("Status", back_populates="tasks")
 
+    __table_args__ = (
+        # GET /tasks filter combinations, each read in id order
+        Index("ix_tasks_user_status", "user_id", "status_id", "id"),
+        Index("ix_tasks_status", "status_id", "id"),
+        # Only tasks without a description (see app.queries.NO_DESCRIPTION)
+        Index("ix_tasks_no_description", "id", postgresql_where=text("description IS NULL OR description = ''")),
+        Index("ix_tasks_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+
+class StatusTaskCount(Base):
+    """Number of tasks per status, kept current by triggers on tasks"""
+    __tablename__ = "task_counts_by_status"
+
+    status_id = Column(Integer, ForeignKey("status.id", ondelete="CASCADE"), primary_key=True)
+    task_count = Column(BigInteger, nullable=False, server_default="0")
+
+
+class UserTaskCount(Base):
+    """Number of tasks per user, kept current by triggers on tasks"""
+    __tablename__ = "task_counts_by_user"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    task_count = Column(BigInteger, nullable=False, server_default="0")
+
+
+class TaskChange(Base):
+    """One change to one task, appended by triggers on tasks for GET /tasks/changes"""
+    __tablename__ = "task_changes"
+
+    id = Column(BigInteger, primary_key=True)
+    # Writing transaction (pg_current_xact_id); see app.task_changes
+    xid = Column(BigInteger, nullable=False)
+    op = Column(String(10), nullable=False)
+    task = Column(JSONB, nullable=False)
+    old_status_id = Column(Integer, nullable=True)
+    changed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_task_changes_xid_id", "xid", "id"),
+        Index("ix_task_changes_changed_at", "changed_at", postgresql_using="brin"),
+    )
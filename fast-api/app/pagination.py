@@ -0,0 +1,89 @@
+"""Keyset (cursor) pagination helpers.
+
+A page is described by an ordering - a list of ``(column, descending)`` pairs
+that must end with a unique column - and an opaque cursor holding the ordering
+values of the last row of the previous page. The next page is fetched with a
+``WHERE (ordering) > (cursor values)`` predicate instead of OFFSET, so page
+latency does not depend on how deep the client is.
+"""
+import base64
+import json
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+Ordering = Sequence[Tuple[Any, bool]]
+
+
+def encode_cursor(key: str, values: Sequence[Any]) -> str:
+    """Pack ordering values into an opaque, URL-safe cursor"""
+    payload = json.dumps({"k": key, "v": list(values)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key: str, size: int) -> List[Any]:
+    """Unpack a cursor produced by encode_cursor for the same ordering"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload["v"]
+        valid = payload["k"] == key and isinstance(values, list) and len(values) == size
+    except (ValueError, TypeError, KeyError):
+        valid = False
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def keyset_filter(ordering: Ordering, values: Sequence[Any]):
+    """Build the "row comes after values" predicate for an ordering.
+
+    Single-direction orderings use a row-value comparison, which Postgres turns
+    into one index range scan; mixed directions fall back to an OR chain.
+    """
+    directions = {descending for _, descending in ordering}
+    if len(directions) == 1:
+        columns = tuple_(*(column for column, _ in ordering))
+        bound = tuple_(*values)
+        return columns < bound if directions.pop() else columns > bound
+
+    clauses = []
+    for i, (column, descending) in enumerate(ordering):
+        equal = [col == values[j] for j, (col, _) in enumerate(ordering[:i])]
+        after = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal, after))
+    return or_(*clauses)
+
+
+def keyset_page(query, ordering: Ordering, key: str, limit: int,
+                cursor: Optional[str] = None, skip: int = 0):
+    """Restrict ``query`` to one page (plus one lookahead row).
+
+    ``query`` may be an ORM Query or a Core select. When ``cursor`` is given the
+    page starts right after it and ``skip`` is ignored; otherwise ``skip`` is
+    applied as a plain OFFSET for older clients. Pass the fetched rows to
+    split_page to get the page and the next cursor.
+    """
+    if cursor:
+        values = decode_cursor(cursor, key, len(ordering))
+        query = query.filter(keyset_filter(ordering, values))
+    elif skip:
+        query = query.offset(skip)
+
+    query = query.order_by(
+        *(column.desc() if descending else column.asc() for column, descending in ordering)
+    ).limit(limit + 1)
+    return query
+
+
+def split_page(rows, ordering: Ordering, key: str, limit: int):
+    """Return ``(rows, next_cursor)``; next_cursor is None on the last page"""
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(key, [getattr(last, col.key) for col, _ in ordering])
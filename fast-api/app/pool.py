@@ -0,0 +1,81 @@
+"""Connection pool settings and instrumentation.
+
+Pool sizing is read from the environment (DB_POOL_SIZE, DB_MAX_OVERFLOW,
+DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS).
+The instrumented pools record how long each checkout waited, so a saturated
+pool can be told apart from a slow database.
+"""
+import os
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.metrics import Histogram
+
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+
+class _InstrumentedPoolMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_time = Histogram()
+        self.timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.wait_time.observe(time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "timeouts": self.timeouts,
+            "wait_seconds": self.wait_time.snapshot(),
+        }
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(poolclass) -> dict:
+    """Keyword arguments for create_engine / create_async_engine"""
+    return {
+        "poolclass": poolclass,
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING,
+    }
+
+
+def psycopg2_connect_args() -> dict:
+    if not STATEMENT_TIMEOUT_MS:
+        return {}
+    return {"options": f"-c statement_timeout={STATEMENT_TIMEOUT_MS}"}
+
+
+def asyncpg_connect_args() -> dict:
+    if not STATEMENT_TIMEOUT_MS:
+        return {}
+    return {"server_settings": {"statement_timeout": str(STATEMENT_TIMEOUT_MS)}}
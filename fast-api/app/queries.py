@@ -0,0 +1,143 @@
+"""Query building blocks shared by the sync and async routes"""
+import os
+import re
+from typing import Iterable, Optional
+
+from sqlalchemy import Float, Integer, and_, any_, bindparam, cast, func, literal_column, or_, select
+from sqlalchemy.dialects.postgresql import ARRAY, REGCONFIG
+
+from app import models
+
+# Upper bound on items accepted by one bulk request
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "10000"))
+
+# Upper bound on rows returned by one search request
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", "100"))
+
+
+USER_ORDERINGS = {
+    "id": [(models.User.id, False)],
+    "email": [(models.User.email, False), (models.User.id, False)],
+}
+
+TASK_ORDERING = [(models.Task.id, False)]
+
+# Plain columns matching schemas.User / schemas.Task, for paths that skip ORM
+# objects (RETURNING clauses, streaming)
+USER_COLUMNS = (
+    models.User.id,
+    models.User.username,
+    models.User.email,
+    models.User.created_at,
+)
+
+TASK_COLUMNS = (
+    models.Task.id,
+    models.Task.title,
+    models.Task.description,
+    models.Task.status_id,
+    models.Task.user_id,
+)
+
+
+def id_in(column, ids):
+    """``column = ANY(:ids)``: one array parameter however many ids there are"""
+    return column == any_(bindparam("ids", list(ids), type_=ARRAY(Integer)))
+
+
+def existing_ids(column, ids):
+    """SELECT the subset of ``ids`` present in ``column``"""
+    return select(column).where(id_in(column, ids))
+
+
+# Written exactly as the predicate of the ix_tasks_no_description partial
+# index, so the planner can prove the index applies. '' is a literal, not a
+# bound parameter, so asyncpg's prepared statements keep matching it too.
+NO_DESCRIPTION = or_(models.Task.description == None, models.Task.description == literal_column("''"))
+HAS_DESCRIPTION = and_(models.Task.description != None, models.Task.description != literal_column("''"))
+
+
+def task_filters(user_id: Optional[int] = None, status_ids: Optional[Iterable[int]] = None,
+                 has_description: Optional[bool] = None, domain: Optional[str] = None) -> list:
+    """WHERE criteria on tasks for the given filters; None skips a filter.
+
+    Each one can be served by an index: user and status by (user_id,
+    status_id, id) or (status_id, id), a missing description by the
+    ix_tasks_no_description partial index, domain as a semi-join through the
+    users email domain index. Rows keep the TASK_COLUMNS shape, so the result
+    can be paged by TASK_ORDERING.
+    """
+    criteria = []
+    if user_id is not None:
+        criteria.append(models.Task.user_id == user_id)
+    if status_ids is not None:
+        criteria.append(models.Task.status_id.in_(sorted(status_ids)))
+    if has_description is not None:
+        criteria.append(HAS_DESCRIPTION if has_description else NO_DESCRIPTION)
+    if domain is not None:
+        criteria.append(models.Task.user_id.in_(select(models.User.id).where(email_domain_is(domain))))
+    return criteria
+
+
+def email_domain_is(domain: str):
+    """Equality on the indexed users.email_domain column.
+
+    Accepts "example.com" or "@example.com" in any case, like the old suffix
+    LIKE, but only whole domains match (no "%example.com" over subdomains).
+    """
+    return models.User.email_domain == domain.strip().lstrip("@").lower()
+
+
+SEARCH_FIELDS = {
+    "email": (models.User.email,),
+    "username": (models.User.username,),
+    "any": (models.User.email, models.User.username),
+}
+
+
+def user_search(q: str, field: str):
+    """``(criterion, rank)`` for a case-insensitive substring search on users.
+
+    The ILIKE '%q%' criterion is served by the pg_trgm GIN indexes on the
+    searched columns. Rank is the trigram similarity to ``q``, cast to double
+    precision so it survives a round trip through a page cursor exactly.
+    """
+    columns = SEARCH_FIELDS[field]
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    criterion = or_(*(column.ilike(f"%{escaped}%", escape="\\") for column in columns))
+    similarities = [func.similarity(column, q) for column in columns]
+    rank = similarities[0] if len(similarities) == 1 else func.greatest(*similarities)
+    return criterion, cast(rank, Float(precision=53)).label("rank")
+
+
+# Text search configuration of tasks.search_vector (see its migration)
+TASK_SEARCH_CONFIG = "english"
+
+# Words of a prefix query: letters and digits only, so none of to_tsquery's
+# operators can get through
+SEARCH_WORD = re.compile(r"[^\W_]+")
+
+
+def task_search(q: str, prefix: bool):
+    """``(criterion, rank)`` for a full-text search on task titles and descriptions,
+    or None when ``q`` has no words.
+
+    With ``prefix`` every word of ``q`` must start a word of the task ("deplo
+    serv" finds "deploy the server"); otherwise ``q`` is read as a web search
+    query (quoted phrases, "or", "-word"). Either way words are stemmed, and
+    the @@ criterion is served by the GIN index on tasks.search_vector. Rank is
+    ts_rank_cd, in which title matches weigh more than description matches.
+    """
+    config = cast(TASK_SEARCH_CONFIG, REGCONFIG)
+    if prefix:
+        words = SEARCH_WORD.findall(q)
+        if not words:
+            return None
+        query = func.to_tsquery(config, " & ".join(f"{word}:*" for word in words))
+    else:
+        if not SEARCH_WORD.search(q):
+            return None
+        query = func.websearch_to_tsquery(config, q)
+    vector = models.Task.search_vector
+    rank = cast(func.ts_rank_cd(vector, query), Float(precision=53)).label("rank")
+    return vector.bool_op("@@")(query), rank
@@ -0,0 +1,149 @@
+"""Per-client rate limiting with a sliding-window counter.
+
+Each client costs three integers: the index of its current window, the number
+of hits in it and the number of hits in the previous window. The request rate
+is estimated by weighting the previous window by how much of it still overlaps
+the sliding period. That makes a check O(1) in time and memory, unlike keeping
+every request timestamp.
+
+Counters live in a pluggable backend, chosen with RATE_LIMIT_BACKEND:
+
+* ``memory`` - an LRU dict private to the worker process. Idle clients are
+  evicted as new requests arrive and RATE_LIMIT_MAX_CLIENTS hard-caps the
+  number of tracked keys.
+* ``shared`` - a fixed-size table in host shared memory, so every worker
+  process on the host enforces one budget. RATE_LIMIT_SHM_SLOTS bounds the
+  table; idle or least recently used slots are reused when it fills up.
+"""
+import os
+import struct
+import time
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+from app.shm import SharedFile, shm_path
+
+# Idle clients dropped per check; keeps eviction amortised O(1)
+EVICT_BATCH = 8
+
+
+class MemoryBackend:
+    """Counters private to this process"""
+
+    def __init__(self, max_clients: int = None):
+        self.max_clients = max_clients or int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "100000"))
+        # key -> [window index, hits in window, hits in previous window]
+        self.clients = OrderedDict()
+
+    def take(self, key: str, window: int, previous_weight: float, calls: int) -> bool:
+        state = self.clients.get(key)
+        if state is None:
+            state = self.clients[key] = [window, 0, 0]
+            self._evict(window)
+        else:
+            self.clients.move_to_end(key)
+            if state[0] != window:
+                state[2] = state[1] if state[0] == window - 1 else 0
+                state[1] = 0
+                state[0] = window
+
+        if state[2] * previous_weight + state[1] >= calls:
+            return False
+        state[1] += 1
+        return True
+
+    def _evict(self, window: int) -> None:
+        clients = self.clients
+        for _ in range(EVICT_BATCH):
+            oldest = next(iter(clients.values()))
+            if oldest[0] >= window - 1:
+                break
+            clients.popitem(last=False)
+
+        while len(clients) > self.max_clients:
+            clients.popitem(last=False)
+
+
+class SharedMemoryBackend:
+    """Counters shared by every process on the host through an mmap'd table.
+
+    The table is set-associative: a key hashes to one group of WAYS slots and
+    only that group is locked and scanned, so a check costs one hash, one
+    byte-range lock and a single struct read.
+    """
+
+    SLOT = struct.Struct("<QqII")  # key hash, window index, hits, previous hits
+    WAYS = 8
+    GROUP = struct.Struct("<" + "QqII" * WAYS)
+
+    def __init__(self, path: str = None, slots: int = None):
+        path = path or os.getenv("RATE_LIMIT_SHM_PATH") or shm_path("ratelimit")
+        slots = slots or int(os.getenv("RATE_LIMIT_SHM_SLOTS", "65536"))
+        self.groups = max(slots // self.WAYS, 1)
+        self.group_size = self.WAYS * self.SLOT.size
+        self.shared = SharedFile(path, self.groups * self.group_size)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        # Builtin hash() is salted per process; every worker must agree
+        data = key.encode()
+        return (zlib.crc32(data) << 32 | zlib.adler32(data)) or 1
+
+    def take(self, key: str, window: int, previous_weight: float, calls: int) -> bool:
+        key_hash = self._hash(key)
+        start = (key_hash % self.groups) * self.group_size
+
+        shared = self.shared
+        buffer = shared.buffer
+        # Plain acquire/release: a context manager costs as much as the lock itself
+        shared.acquire(start, self.group_size)
+        try:
+            fields = self.GROUP.unpack_from(buffer, start)
+            hashes = fields[0::4]
+            if key_hash in hashes:
+                way = hashes.index(key_hash)
+                _, slot_window, hits, previous = fields[way * 4:way * 4 + 4]
+                if slot_window != window:
+                    previous = hits if slot_window == window - 1 else 0
+                    hits = 0
+            else:
+                # Take the slot touched longest ago; unused slots read as window 0
+                windows = fields[1::4]
+                way = windows.index(min(windows))
+                hits = previous = 0
+
+            allowed = previous * previous_weight + hits < calls
+            if allowed:
+                hits += 1
+            self.SLOT.pack_into(buffer, start + way * self.SLOT.size, key_hash, window, hits, previous)
+        finally:
+            shared.release(start, self.group_size)
+        return allowed
+
+
+BACKENDS = {
+    "memory": MemoryBackend,
+    "shared": SharedMemoryBackend,
+}
+
+
+class RateLimiter:
+    def __init__(self, calls: int = None, period: int = None, backend=None):
+        self.calls = calls or int(os.getenv("RATE_LIMIT_CALLS", "100"))
+        self.period = period or int(os.getenv("RATE_LIMIT_PERIOD", "60"))
+        self.backend = backend or BACKENDS[os.getenv("RATE_LIMIT_BACKEND", "memory")]()
+
+    def hit(self, key: str, now: float = None) -> Optional[float]:
+        """Record a request for ``key``.
+
+        Returns None if the request is allowed, otherwise the number of seconds
+        after which the client should retry.
+        """
+        now = time.time() if now is None else now
+        position = now / self.period
+        window = int(position)
+
+        if self.backend.take(key, window, 1 - (position - window), self.calls):
+            return None
+        return (window + 1 - position) * self.period
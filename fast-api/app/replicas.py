@@ -0,0 +1,165 @@
+"""Read replicas for the read-only endpoints.
+
+POSTGRES_REPLICA_HOSTS lists replicas as ``host[:port]``, separated by commas.
+They use the primary's user, password and database. database.get_read_db gives
+each request a session on the next usable replica, round-robin:
+- A replica is checked at most every REPLICA_CHECK_SECONDS and skipped while
+  it is unreachable or more than REPLICA_MAX_LAG_SECONDS behind.
+- A replica that refuses a connection is skipped until its next check.
+- When no replica is usable, reads go to the primary.
+
+Read-your-writes: a successful write sets a cookie that sends the same
+client's reads to the primary for READ_YOUR_WRITES_SECONDS. Clients without a
+cookie jar can still see their write disappear for up to the replica lag.
+
+Reads served by a replica mark the request with the staleness they may carry.
+The response cache then stores them only once the tables they read last
+changed longer ago than that.
+"""
+import itertools
+import os
+import threading
+import time
+from http.cookies import SimpleCookie
+from typing import Callable, List, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import sessionmaker
+
+REPLICA_HOSTS = [host.strip() for host in os.getenv("POSTGRES_REPLICA_HOSTS", "").split(",") if host.strip()]
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_CHECK_SECONDS = float(os.getenv("REPLICA_CHECK_SECONDS", "5"))
+REPLICA_CONNECT_TIMEOUT = int(os.getenv("REPLICA_CONNECT_TIMEOUT", "2"))
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+READ_YOUR_WRITES_COOKIE = "read_primary_until"
+
+# Replay delay in seconds; 0 when the replica has replayed everything it received
+LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE coalesce(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class Replica:
+    def __init__(self, host: str, engine: Engine):
+        self.host = host
+        self.engine = engine
+        self.sessionmaker = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        self.healthy = True
+        self.lag: Optional[float] = None
+        self.error: Optional[str] = None
+        self.checked_at = 0.0
+        self._checking = threading.Lock()
+
+    def usable(self) -> bool:
+        """Current health, re-checked when the last check is older than REPLICA_CHECK_SECONDS"""
+        if time.monotonic() - self.checked_at >= REPLICA_CHECK_SECONDS and self._checking.acquire(blocking=False):
+            # One thread checks; the others keep using the previous verdict
+            try:
+                self.check()
+            finally:
+                self._checking.release()
+        return self.healthy
+
+    def check(self) -> None:
+        try:
+            with self.engine.connect() as conn:
+                self.lag = float(conn.execute(LAG_QUERY).scalar())
+            self.error = None if self.lag <= REPLICA_MAX_LAG_SECONDS else f"lagging {self.lag:.1f}s"
+        except SQLAlchemyError as e:
+            self.lag = None
+            self.error = str(e.orig if hasattr(e, "orig") else e).strip()
+        self.healthy = self.error is None
+        self.checked_at = time.monotonic()
+
+    def mark_down(self, error: Exception) -> None:
+        self.healthy = False
+        self.error = str(error).strip()
+        self.checked_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "error": self.error,
+            "pool": self.engine.pool.stats(),
+        }
+
+
+class ReplicaSet:
+    def __init__(self, replicas: List[Replica]):
+        self.replicas = replicas
+        self._turn = itertools.count()
+
+    @classmethod
+    def from_hosts(cls, hosts: List[str], url: Callable[[str, str], str], **engine_kwargs) -> "ReplicaSet":
+        """One engine per ``host[:port]``; ``url(host, port)`` builds its database URL"""
+        replicas = []
+        for entry in hosts:
+            host, _, port = entry.partition(":")
+            replicas.append(Replica(entry, create_engine(url(host, port or "5432"), **engine_kwargs)))
+        return cls(replicas)
+
+    @property
+    def engines(self) -> List[Engine]:
+        return [replica.engine for replica in self.replicas]
+
+    def choose(self) -> Optional[Replica]:
+        """The next usable replica in round-robin order, or None"""
+        if not self.replicas:
+            return None
+        start = next(self._turn)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if replica.usable():
+                return replica
+        return None
+
+    def dispose(self, close: bool = True) -> None:
+        for replica in self.replicas:
+            replica.engine.dispose(close=close)
+
+    def stats(self) -> dict:
+        return {replica.host: replica.stats() for replica in self.replicas}
+
+
+def reads_from_primary(cookies: dict) -> bool:
+    """True while the client is inside its read-your-writes window"""
+    try:
+        return time.time() * 1000 < int(cookies.get(READ_YOUR_WRITES_COOKIE, 0))
+    except ValueError:
+        return False
+
+
+class ReadYourWritesMiddleware:
+    """Sets the read-your-writes cookie on every successful write (pure ASGI)"""
+
+    SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, app, seconds: float = READ_YOUR_WRITES_SECONDS):
+        self.app = app
+        self.seconds = seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in self.SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = SimpleCookie()
+                cookie[READ_YOUR_WRITES_COOKIE] = str(int((time.time() + self.seconds) * 1000))
+                cookie[READ_YOUR_WRITES_COOKIE].update(
+                    {"max-age": int(self.seconds) or 1, "path": "/", "httponly": True, "samesite": "Lax"}
+                )
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"set-cookie", cookie[READ_YOUR_WRITES_COOKIE].OutputString().encode()),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,223 @@
+"""HTTP response cache with ETag / Last-Modified validation.
+
+GET routes opt in with ``dependencies=[cached("users", "tasks")]``, naming the
+tables their response is built from; write routes declare what they change
+with ``invalidates("tasks")``. Responses of cacheable routes are kept in a
+per-process LRU bounded by RESPONSE_CACHE_MAX_BYTES and replayed without
+touching the database until a write invalidates one of their tags.
+
+Invalidation is host-wide: each tag has a generation number (and the time it
+last changed) in shared memory. An entry remembers the generations it was
+built under, and any mismatch on lookup makes it a miss, so a write through
+one worker is seen by every worker on its next lookup.
+
+Every cacheable response carries an ETag and ``Cache-Control: no-cache``, so
+clients revalidate with If-None-Match and get a bodiless 304 when nothing
+changed.
+"""
+import hashlib
+import math
+import os
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+from fastapi import Depends, Request
+from fastapi.responses import Response
+
+from app.shm import SharedCounters
+
+TAGS = ("users", "tasks", "statuses")
+
+# Headers of the handler's response that are replayed on a hit; CORS headers are
+# added by CORSMiddleware, which runs outside this cache
+STORED_HEADERS = ("content-type", "x-next-cursor")
+
+
+def cached(*tags: str):
+    """Route dependency: cache GET responses until a write touches one of ``tags``"""
+    async def mark_cacheable(request: Request):
+        # Dependencies run before the handler queries anything, so a write
+        # racing with this request leaves the stored entry already stale
+        request.state.cache_tags = tags
+        request.state.cache_snapshot = response_cache.snapshot(tags)
+    return Depends(mark_cacheable)
+
+
+def invalidates(*tags: str):
+    """Route dependency: drop cached responses for ``tags`` once the write is done"""
+    async def mark_invalidating(request: Request):
+        request.state.invalidate_tags = tags
+    return Depends(mark_invalidating)
+
+
+class CacheEntry:
+    __slots__ = ("body", "headers", "etag", "tags", "generations", "changed_at")
+
+    def __init__(self, body: bytes, headers: Dict[str, str], tags: Tuple[str, ...],
+                 generations: Tuple[int, ...], changed_at: float):
+        self.body = body
+        self.headers = headers
+        self.etag = '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.tags = tags
+        self.generations = generations
+        self.changed_at = changed_at
+
+
+class ResponseCache:
+    def __init__(self, max_bytes: int = None, max_entry_bytes: int = None):
+        self.max_bytes = max_bytes or int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        self.max_entry_bytes = max_entry_bytes or int(os.getenv("RESPONSE_CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+        self.entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.bytes = 0
+        # Per tag: generation at 2*i, last change time in ms at 2*i + 1
+        self._tags = {tag: i for i, tag in enumerate(TAGS)}
+        self._shared = SharedCounters("response-cache", 2 * len(TAGS))
+        self.counters = {"hits": 0, "misses": 0, "not_modified": 0, "stale": 0, "evictions": 0, "uncacheable": 0}
+
+    # Tag state
+
+    def invalidate(self, tags) -> None:
+        """Make every entry depending on ``tags`` stale in every worker on this host"""
+        now_ms = int(time.time() * 1000)
+        for tag in tags:
+            i = self._tags[tag]
+            # Change time first: a reader that sees the new generation also sees it
+            self._shared.set(2 * i + 1, now_ms)
+            self._shared.bump(2 * i)
+
+    def snapshot(self, tags) -> Tuple[Tuple[int, ...], float]:
+        """Current generations of ``tags`` and the latest time any of them changed"""
+        indexes = [self._tags[tag] for tag in tags]
+        generations = tuple(self._shared.get(2 * i) for i in indexes)
+        changed_ms = max(self._shared.get(2 * i + 1) for i in indexes)
+        return generations, changed_ms / 1000
+
+    # LRU
+
+    def _lookup(self, key: str) -> Optional[CacheEntry]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if self.snapshot(entry.tags)[0] != entry.generations:
+            self._discard(key)
+            self.counters["stale"] += 1
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: str, entry: CacheEntry) -> None:
+        self._discard(key)
+        self.entries[key] = entry
+        self.bytes += len(entry.body)
+        while self.bytes > self.max_bytes:
+            _, oldest = self.entries.popitem(last=False)
+            self.bytes -= len(oldest.body)
+            self.counters["evictions"] += 1
+
+    def _discard(self, key: str) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= len(entry.body)
+
+    def stats(self) -> dict:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_ratio": self.counters["hits"] / lookups if lookups else 0.0,
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    # HTTP
+
+    @staticmethod
+    def _key(request: Request) -> str:
+        # Accept selects JSON vs NDJSON/CSV on the list endpoints
+        return f"{request.url.path}?{request.url.query}|{request.headers.get('accept', '')}"
+
+    @staticmethod
+    def _last_modified(entry: CacheEntry) -> Optional[int]:
+        # HTTP dates have one-second resolution. Advertising the next whole
+        # second, and only once it is in the past, guarantees that any later
+        # change gets a strictly later Last-Modified.
+        if not entry.changed_at:
+            return None
+        last_modified = math.ceil(entry.changed_at)
+        return last_modified if time.time() >= entry.changed_at + 1 else None
+
+    def _validators(self, entry: CacheEntry) -> Dict[str, str]:
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+        last_modified = self._last_modified(entry)
+        if last_modified is not None:
+            headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+        return headers
+
+    def _not_modified(self, request: Request, entry: CacheEntry) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            etags = [etag.strip().removeprefix("W/") for etag in if_none_match.split(",")]
+            return "*" in etags or entry.etag in etags
+
+        if_modified_since = request.headers.get("if-modified-since")
+        last_modified = self._last_modified(entry)
+        if if_modified_since is None or last_modified is None:
+            return False
+        try:
+            return last_modified <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    def _respond(self, request: Request, entry: CacheEntry, source: str) -> Response:
+        headers = self._validators(entry)
+        headers["X-Cache"] = source
+        if self._not_modified(request, entry):
+            self.counters["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, status_code=200, headers={**entry.headers, **headers})
+
+    async def handle(self, request: Request, call_next) -> Response:
+        """Middleware body: serve GETs from the cache and apply write invalidations"""
+        if request.method != "GET":
+            response = await call_next(request)
+            tags = getattr(request.state, "invalidate_tags", None)
+            if tags:
+                self.invalidate(tags)
+            return response
+
+        key = self._key(request)
+        entry = self._lookup(key)
+        if entry is not None:
+            self.counters["hits"] += 1
+            return self._respond(request, entry, "HIT")
+
+        response = await call_next(request)
+        tags = getattr(request.state, "cache_tags", None)
+        if not tags:
+            return response
+
+        self.counters["misses"] += 1
+        content_type = response.headers.get("content-type", "")
+        if response.status_code != 200 or not content_type.startswith("application/json"):
+            self.counters["uncacheable"] += 1
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        generations, changed_at = request.state.cache_snapshot
+        headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        entry = CacheEntry(body, headers, tags, generations, changed_at)
+        # A replica read may predate the last write to its tables, which would
+        # then be cached under the new generations; serve it but do not keep it
+        max_staleness = getattr(request.state, "max_staleness", 0)
+        if max_staleness and time.time() < changed_at + max_staleness:
+            self.counters["uncacheable"] += 1
+        elif len(body) <= self.max_entry_bytes:
+            self._store(key, entry)
+        else:
+            self.counters["uncacheable"] += 1
+        return self._respond(request, entry, "MISS")
+
+
+response_cache = ResponseCache()
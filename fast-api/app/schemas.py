@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, model_validator
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -40,6 +40,10 @@ class User(UserBase):
         from_attributes = True
 
 
+class UserSearchResult(User):
+    rank: float
+
+
 class UserWithTaskCount(BaseModel):
     username: str
     task_count: int
@@ -69,6 +73,45 @@ class TaskStatusUpdate(BaseModel):
     status_id: int
 
 
+class TaskBulkStatusFilter(BaseModel):
+    user_id: Optional[int] = None
+    status_id: Optional[int] = None
+
+    @model_validator(mode="after")
+    def check_not_empty(self):
+        if self.user_id is None and self.status_id is None:
+            raise ValueError("filter needs user_id and/or status_id")
+        return self
+
+
+class TaskBulkStatusUpdate(BaseModel):
+    status_id: int
+    task_ids: Optional[List[int]] = Field(None, min_length=1)
+    filter: Optional[TaskBulkStatusFilter] = None
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if (self.task_ids is None) == (self.filter is None):
+            raise ValueError("pass exactly one of task_ids or filter")
+        return self
+
+
+class TaskBulkStatusResult(BaseModel):
+    status_id: int
+    updated: List[int]
+    not_found: List[int]
+
+
+class BulkItemError(BaseModel):
+    index: int
+    detail: str
+
+
+class TaskBulkCreateResult(BaseModel):
+    created: List["Task"]
+    errors: List[BulkItemError]
+
+
 class Task(TaskBase):
     id: int
     status_id: int
@@ -78,6 +121,10 @@ class Task(TaskBase):
         from_attributes = True
 
 
+class TaskSearchResult(Task):
+    rank: float
+
+
 class TaskWithDetails(BaseModel):
     id: int
     title: str
@@ -106,3 +153,5 @@ class TaskCountByStatus(BaseModel):
     class Config:
         from_attributes = True
 
+
+TaskBulkCreateResult.model_rebuild()
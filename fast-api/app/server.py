@@ -0,0 +1,148 @@
+"""Production entry point: gunicorn supervising uvicorn workers.
+
+    python -m app.server
+
+The worker count follows the CPUs this process may use (affinity and cgroup
+quota), one event loop per core, and is capped so that every worker's
+connection pools together fit within Postgres's max_connections. WEB_CONCURRENCY
+overrides the CPU-based count but not the cap.
+
+The app is imported once in the master (preload), so workers fork with all
+code loaded. Each child discards the engines' pools it inherited, so no
+connection is shared between processes. Workers are replaced after about
+MAX_REQUESTS requests, with jitter so they do not all restart at once.
+SIGTERM stops accepting connections and gives in-flight requests up to
+GRACEFUL_TIMEOUT seconds; the app's lifespan then closes its pools.
+
+Migrations are not run here; `alembic upgrade head` is a separate step.
+"""
+import logging
+import math
+import os
+from typing import Optional
+
+from gunicorn.app.base import BaseApplication
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.pool import MAX_OVERFLOW, POOL_SIZE
+
+BIND = os.getenv("BIND", "0.0.0.0:8000")
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0"))  # 0 = one per available CPU
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "10000"))
+MAX_REQUESTS_JITTER = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+WORKER_TIMEOUT = int(os.getenv("WORKER_TIMEOUT", "60"))
+KEEPALIVE = int(os.getenv("KEEPALIVE", "5"))
+# Server-wide connection limit; 0 = ask Postgres
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "0"))
+# Left free for migrations, psql, the counter reconciler and other hosts' workers
+DB_RESERVED_CONNECTIONS = int(os.getenv("DB_RESERVED_CONNECTIONS", "10"))
+
+logger = logging.getLogger(__name__)
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on, honouring a cgroup v2 CPU quota"""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def connections_per_worker() -> int:
+    """Most connections one worker can open: both engines' pools at full overflow, plus the EXPLAIN
+    connection and the change feed's listener"""
+    return 2 * (POOL_SIZE + MAX_OVERFLOW) + 2
+
+
+def connection_budget() -> Optional[int]:
+    """Connections available to the API's workers, or None if Postgres cannot be asked"""
+    if DB_MAX_CONNECTIONS:
+        return DB_MAX_CONNECTIONS - DB_RESERVED_CONNECTIONS
+
+    from app.database import engine
+
+    try:
+        with engine.connect() as conn:
+            max_connections = int(conn.execute(text("SHOW max_connections")).scalar())
+            superuser_reserved = int(conn.execute(text("SHOW superuser_reserved_connections")).scalar())
+    except SQLAlchemyError:
+        logger.warning("Could not read max_connections; not capping workers by connections", exc_info=True)
+        return None
+    finally:
+        engine.dispose()
+    return max_connections - superuser_reserved - DB_RESERVED_CONNECTIONS
+
+
+def worker_count() -> int:
+    workers = WEB_CONCURRENCY or available_cpus()
+    budget = connection_budget()
+    if budget is not None:
+        affordable = budget // connections_per_worker()
+        if affordable < workers:
+            logger.warning(
+                "Limiting workers from %d to %d: %d connections available, up to %d per worker "
+                "(lower DB_POOL_SIZE/DB_MAX_OVERFLOW or raise max_connections for more)",
+                workers, max(affordable, 1), budget, connections_per_worker(),
+            )
+            workers = affordable
+    return max(workers, 1)
+
+
+def post_fork(server, worker) -> None:
+    """Drop pooled connections inherited from the master; each worker opens its own"""
+    from app.database import async_engine, engine, replicas
+
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    replicas.dispose(close=False)
+
+
+class Server(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app.main import app
+
+        return app
+
+
+def options() -> dict:
+    return {
+        "bind": BIND,
+        "workers": worker_count(),
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "post_fork": post_fork,
+        "max_requests": MAX_REQUESTS,
+        "max_requests_jitter": MAX_REQUESTS_JITTER,
+        "graceful_timeout": GRACEFUL_TIMEOUT,
+        "timeout": WORKER_TIMEOUT,
+        "keepalive": KEEPALIVE,
+        "accesslog": "-",
+        "errorlog": "-",
+    }
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    logger.setLevel(logging.INFO)
+    config = options()
+    logger.info("Starting %d workers on %s", config["workers"], config["bind"])
+    Server(config).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Host-wide shared memory backed by an mmap'd file.
+
+Every worker process on the host maps the same file (under /dev/shm by default)
+with MAP_SHARED, so writes are immediately visible to all of them. Concurrent
+read-modify-write cycles are serialised with POSIX byte-range locks (lockf)
+between processes. Those locks are held per process, so they also work on
+descriptors inherited across fork, but they do not exclude threads of the same
+process; a per-file thread lock is taken with them for that.
+
+Files are named after SHM_NAMESPACE. The default is derived from the database
+the app uses, so every process serving one database shares counters and cache
+generations, while other deployments and test runs on the host get their own.
+
+Each process holds a shared flock on every file it maps. A file of the wrong
+size is only resized when no other process holds it; otherwise startup fails
+rather than truncating memory that live processes still use.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from contextlib import contextmanager
+
+SHM_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+SHM_NAMESPACE = os.getenv("SHM_NAMESPACE") or "task-api-" + hashlib.blake2b(
+    "{}:{}/{}".format(
+        os.getenv("POSTGRES_HOST", "db"), os.getenv("POSTGRES_PORT", "5432"), os.getenv("POSTGRES_DB", "task_db")
+    ).encode(),
+    digest_size=4,
+).hexdigest()
+
+
+def shm_path(name: str) -> str:
+    return os.path.join(SHM_DIR, f"{SHM_NAMESPACE}-{name}")
+
+
+class SharedFile:
+    """A fixed-size file mapped into memory, with byte-range locking"""
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.size = size
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self.buffer = None
+        self._threads = threading.Lock()
+        with self.lock(0, 0):
+            current = os.fstat(self.fd).st_size
+            in_use = current not in (0, size) and not self._unused()
+            if not in_use:
+                if current != size:
+                    # New file, or one left behind with another layout: start from zeros
+                    os.ftruncate(self.fd, 0)
+                    os.ftruncate(self.fd, size)
+                # Held while mapped, so later processes can tell the file is in use
+                fcntl.flock(self.fd, fcntl.LOCK_SH)
+        if in_use:
+            os.close(self.fd)
+            raise RuntimeError(
+                f"{path} is {current} bytes but this process needs {size}: running processes use "
+                f"another layout (e.g. RATE_LIMIT_SHM_SLOTS). Stop them or set a different SHM_NAMESPACE."
+            )
+        self.buffer = mmap.mmap(self.fd, size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+
+    def _unused(self) -> bool:
+        """True when no other process (or other SharedFile) has the file mapped"""
+        try:
+            fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+
+    def acquire(self, start: int, length: int) -> None:
+        """Exclusively lock ``length`` bytes from ``start`` (0 = to end of file)"""
+        self._threads.acquire()
+        try:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, length, start)
+        except BaseException:
+            self._threads.release()
+            raise
+
+    def release(self, start: int, length: int) -> None:
+        try:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, length, start)
+        finally:
+            self._threads.release()
+
+    @contextmanager
+    def lock(self, start: int, length: int):
+        self.acquire(start, length)
+        try:
+            yield self.buffer
+        finally:
+            self.release(start, length)
+
+
+class SharedCounters:
+    """A small array of 64-bit counters shared by every process on the host.
+
+    Used as generation numbers: a writer bumps a counter, and readers compare
+    it to the value they last saw to find out that their local copy is stale.
+    Reads are a single aligned 8-byte load and take no lock.
+    """
+
+    COUNTER = struct.Struct("<Q")
+
+    def __init__(self, name: str, size: int):
+        self.shared = SharedFile(shm_path(name), size * self.COUNTER.size)
+
+    def get(self, index: int) -> int:
+        return self.COUNTER.unpack_from(self.shared.buffer, index * self.COUNTER.size)[0]
+
+    def set(self, index: int, value: int) -> None:
+        offset = index * self.COUNTER.size
+        with self.shared.lock(offset, self.COUNTER.size) as buffer:
+            self.COUNTER.pack_into(buffer, offset, value)
+
+    def bump(self, index: int) -> int:
+        offset = index * self.COUNTER.size
+        with self.shared.lock(offset, self.COUNTER.size) as buffer:
+            value = self.COUNTER.unpack_from(buffer, offset)[0] + 1
+            self.COUNTER.pack_into(buffer, offset, value)
+        return value
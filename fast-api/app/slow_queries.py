@@ -0,0 +1,197 @@
+"""Slow-query log with EXPLAIN capture.
+
+Engine events time every statement. One that takes longer than
+SLOW_QUERY_MS, or fails after that long (statement timeouts), is kept as a
+sample:
+- its SQL;
+- its bound parameters, with string values redacted unless
+  SLOW_QUERY_REDACT=false;
+- the route that issued it;
+- its duration.
+
+A background thread then adds an ``EXPLAIN (FORMAT JSON)`` plan, without
+ANALYZE, so the statement is planned with the real parameter values but not
+run again. The thread uses its own connection and never takes one from the
+app's pools.
+
+The newest SLOW_QUERY_LOG_SIZE samples of this worker are kept in memory
+(GET /admin/slow-queries). Each one is also logged as a JSON line on the
+"app.slow_queries" logger once its plan is in.
+"""
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import psycopg2
+from sqlalchemy import event
+
+from app import instrumentation
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "100"))
+SLOW_QUERY_REDACT = os.getenv("SLOW_QUERY_REDACT", "true").lower() != "false"
+# Plans still waiting beyond this are skipped rather than queued
+EXPLAIN_BACKLOG = 32
+EXPLAIN_TIMEOUT_MS = 5000
+
+# Statements EXPLAIN accepts; anything else (COPY, DDL, SET, ...) is logged without a plan
+EXPLAINABLE = re.compile(r"\s*(SELECT|INSERT|UPDATE|DELETE|WITH|VALUES)\b", re.IGNORECASE)
+
+logger = logging.getLogger(__name__)
+
+
+def redact(value):
+    if not SLOW_QUERY_REDACT:
+        return value
+    if isinstance(value, (str, bytes)):
+        return f"<redacted {type(value).__name__} of {len(value)}>"
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
+
+class SlowQueryLog:
+    """Ring buffer of slow statements, plus the thread that explains them"""
+
+    def __init__(self, database_url: str, threshold_ms: float = SLOW_QUERY_MS, size: int = SLOW_QUERY_LOG_SIZE):
+        self.database_url = database_url
+        self.threshold = threshold_ms / 1000
+        self.samples = deque(maxlen=size)
+        self.pending = queue.Queue(maxsize=EXPLAIN_BACKLOG)
+        self.thread: Optional[threading.Thread] = None
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def install(self, *engines) -> None:
+        """Time statements executed through ``engines`` (sync Engine objects)"""
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+            event.listen(engine, "handle_error", self._handle_error)
+
+    def recent(self, limit: int) -> List[dict]:
+        """Newest samples first"""
+        with self.lock:
+            return list(self.samples)[::-1][:limit]
+
+    # Engine events
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["slow_query_start"] = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self._finish(conn, statement, parameters, executemany)
+
+    def _handle_error(self, exception_context):
+        conn = exception_context.connection
+        if conn is not None and exception_context.statement is not None:
+            self._finish(
+                conn,
+                exception_context.statement,
+                exception_context.parameters,
+                bool(exception_context.execution_context and exception_context.execution_context.executemany),
+                error=repr(exception_context.original_exception),
+            )
+
+    def _finish(self, conn, statement, parameters, executemany, error=None):
+        start = conn.info.pop("slow_query_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        if elapsed < self.threshold:
+            return
+        # executemany: the first parameter set is representative
+        if executemany and parameters:
+            parameters = parameters[0]
+        self.record(statement, parameters, elapsed, conn.dialect.paramstyle, error)
+
+    # Recording
+
+    def record(self, statement: str, parameters, seconds: float, paramstyle: str, error: Optional[str] = None):
+        sample = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(seconds * 1000, 1),
+            "route": instrumentation.current_route(),
+            "statement": statement,
+            "parameters": redact(parameters),
+            "error": error,
+            "plan": None,
+            "explain_error": None,
+        }
+        with self.lock:
+            self.samples.append(sample)
+
+        if not EXPLAINABLE.match(statement):
+            sample["explain_error"] = "not explainable"
+            self._log(sample)
+            return
+        self._ensure_thread()
+        try:
+            self.pending.put_nowait((sample, statement, parameters, paramstyle))
+        except queue.Full:
+            sample["explain_error"] = "skipped: EXPLAIN backlog full"
+            self._log(sample)
+
+    @staticmethod
+    def _log(sample: dict) -> None:
+        logger.warning("slow_query %s", json.dumps(sample, default=str))
+
+    # EXPLAIN thread
+
+    def _ensure_thread(self) -> None:
+        # Threads do not survive fork, so each worker process starts its own
+        if self.thread is not None and self.pid == os.getpid() and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread is None or self.pid != os.getpid() or not self.thread.is_alive():
+                self.pid = os.getpid()
+                self.thread = threading.Thread(target=self._explain_forever, name="slow-query-explain", daemon=True)
+                self.thread.start()
+
+    def _explain_forever(self) -> None:
+        conn = None
+        while True:
+            sample, statement, parameters, paramstyle = self.pending.get()
+            try:
+                if conn is None or conn.closed:
+                    conn = psycopg2.connect(self.database_url, options=f"-c statement_timeout={EXPLAIN_TIMEOUT_MS}")
+                    conn.autocommit = True
+                sample["plan"] = self._explain(conn, statement, parameters, paramstyle)
+            except psycopg2.Error as e:
+                sample["explain_error"] = str(e).strip()
+                if conn is not None and conn.closed:
+                    conn = None
+            except Exception as e:  # never let one odd statement stop the thread
+                sample["explain_error"] = repr(e)
+            self._log(sample)
+
+    @staticmethod
+    def _explain(conn, statement: str, parameters, paramstyle: str):
+        with conn.cursor() as cursor:
+            if paramstyle != "numeric_dollar":
+                # psycopg2's own statements: same SQL, same parameters
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+                return cursor.fetchone()[0]
+
+            # asyncpg's statements use $1::TYPE placeholders, which a prepared
+            # statement accepts as they are
+            cursor.execute(f"PREPARE slow_query_explain AS {statement}")
+            try:
+                if parameters:
+                    placeholders = ", ".join(["%s"] * len(parameters))
+                    cursor.execute(f"EXPLAIN (FORMAT JSON) EXECUTE slow_query_explain ({placeholders})", tuple(parameters))
+                else:
+                    cursor.execute("EXPLAIN (FORMAT JSON) EXECUTE slow_query_explain")
+                return cursor.fetchone()[0]
+            finally:
+                cursor.execute("DEALLOCATE slow_query_explain")
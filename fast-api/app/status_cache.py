@@ -0,0 +1,133 @@
+"""In-process cache of the ``status`` lookup table.
+
+The table holds a handful of rows that only change through migrations, so it
+is loaded once at startup and every id->name / name->id lookup is served from
+memory instead of a SELECT per request.
+
+invalidate() bumps a generation number in host shared memory. Every worker
+compares it with the generation it loaded on the next lookup and reloads when
+they differ, so one call (e.g. POST /statuses/refresh after adding a status)
+refreshes all workers on the host.
+
+Sync routes use the lookup methods directly; a reload there is a blocking
+query, which is fine in the threadpool. Async routes take a ``Statuses``
+snapshot from the get_statuses dependency instead, which reloads through the
+async engine and never blocks the event loop.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import select
+
+from app import models
+from app.database import AsyncSessionLocal, SessionLocal
+from app.shm import SharedCounters
+
+STATUS_QUERY = select(models.Status.id, models.Status.name).order_by(models.Status.id)
+
+
+class Statuses:
+    """One consistent copy of the status table"""
+
+    def __init__(self, rows: Iterable[Tuple[int, str]] = ()):
+        self._by_id: Dict[int, str] = {status_id: name for status_id, name in rows}
+        self._by_name: Dict[str, int] = {name: status_id for status_id, name in self._by_id.items()}
+
+    def name(self, status_id: int) -> Optional[str]:
+        return self._by_id.get(status_id)
+
+    def id(self, name: str) -> Optional[int]:
+        return self._by_name.get(name)
+
+    def all(self) -> List[dict]:
+        return [{"id": status_id, "name": name} for status_id, name in self._by_id.items()]
+
+    def select(self, include: Optional[Sequence[str]] = None,
+               exclude: Optional[Sequence[str]] = None) -> Optional[Set[int]]:
+        """Ids of the statuses named in ``include`` (default: all) minus those in
+        ``exclude``, or None when neither is given. Raises KeyError for an
+        unknown name.
+
+        Exclusions are turned into the list of remaining ids, so callers filter
+        with ``status_id IN (...)``, which an index can match, instead of ``<>``.
+        """
+        if include is None and exclude is None:
+            return None
+        by_name = self._by_name
+        for name in (*(include or ()), *(exclude or ())):
+            if name not in by_name:
+                raise KeyError(name)
+        selected = {by_name[name] for name in include} if include is not None else set(by_name.values())
+        return selected - {by_name[name] for name in exclude or ()}
+
+
+class StatusCache:
+    def __init__(self):
+        self._statuses = Statuses()
+        self._generations = SharedCounters("status-cache", 1)
+        self._loaded_generation = None
+
+    def _stale(self) -> bool:
+        return self._loaded_generation != self._generations.get(0)
+
+    def _install(self, rows, generation: int) -> None:
+        # Swap the whole snapshot so concurrent readers never see a half-built cache
+        self._statuses = Statuses(rows)
+        self._loaded_generation = generation
+
+    def refresh(self) -> None:
+        """Reload the table from the database"""
+        generation = self._generations.get(0)
+        db = SessionLocal()
+        try:
+            rows = db.execute(STATUS_QUERY).all()
+        finally:
+            db.close()
+        self._install(rows, generation)
+
+    def load(self, rows: Iterable[Tuple[int, str]]) -> None:
+        """Install ``(id, name)`` rows without a query, e.g. to seed tests"""
+        self._install(rows, self._generations.get(0))
+
+    async def refresh_async(self) -> None:
+        """Reload the table through the async engine"""
+        generation = self._generations.get(0)
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(STATUS_QUERY)).all()
+        self._install(rows, generation)
+
+    def invalidate(self) -> None:
+        """Mark the cache stale in every worker on this host"""
+        self._generations.bump(0)
+
+    def current(self) -> Statuses:
+        """The current snapshot, reloaded first if another worker invalidated it"""
+        if self._stale():
+            self.refresh()
+        return self._statuses
+
+    async def current_async(self) -> Statuses:
+        if self._stale():
+            await self.refresh_async()
+        return self._statuses
+
+    def name(self, status_id: int) -> Optional[str]:
+        return self.current().name(status_id)
+
+    def id(self, name: str) -> Optional[int]:
+        return self.current().id(name)
+
+    def all(self) -> List[dict]:
+        return self.current().all()
+
+    def select(self, include: Optional[Sequence[str]] = None,
+               exclude: Optional[Sequence[str]] = None) -> Optional[Set[int]]:
+        """See Statuses.select"""
+        return self.current().select(include, exclude)
+
+
+status_cache = StatusCache()
+
+
+async def get_statuses() -> Statuses:
+    """Dependency for async routes: a fresh status snapshot, loaded without blocking"""
+    return await status_cache.current_async()
@@ -0,0 +1,82 @@
+"""Streaming (NDJSON / CSV) responses for unbounded list endpoints.
+
+Rows are read through a server-side cursor in batches of STREAM_BATCH_SIZE and
+written to the client as each batch arrives, so worker memory stays bounded no
+matter how many rows the query returns.
+"""
+import csv
+import io
+import json
+import os
+from typing import Iterator, Literal, Optional
+
+from fastapi import Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.database import SessionLocal
+
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "1000"))
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def stream_format(
+    request: Request,
+    format: Optional[Literal["json", "ndjson", "csv"]] = Query(
+        None, description="Response format; ndjson and csv are streamed (also selectable via Accept)"
+    ),
+) -> Optional[str]:
+    """Dependency returning "ndjson"/"csv" when the client asked for a stream, else None"""
+    if format is not None:
+        return None if format == "json" else format
+
+    accept = request.headers.get("accept", "")
+    if MEDIA_TYPES["ndjson"] in accept:
+        return "ndjson"
+    if "text/csv" in accept:
+        return "csv"
+    return None
+
+
+def _iter_ndjson(result) -> Iterator[str]:
+    keys = list(result.keys())
+    for batch in result.partitions():
+        yield "".join(
+            json.dumps(dict(zip(keys, row)), default=str) + "\n" for row in batch
+        )
+
+
+def _iter_csv(result) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(result.keys())
+    for batch in result.partitions():
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _iter_rows(statement, fmt: str, bind) -> Iterator[str]:
+    # The request-scoped session may be closed before the body is sent, so the
+    # stream owns its own session for as long as the cursor is open.
+    db = SessionLocal(bind=bind) if bind is not None else SessionLocal()
+    try:
+        result = db.execute(statement.execution_options(yield_per=STREAM_BATCH_SIZE))
+        if fmt == "csv":
+            yield from _iter_csv(result)
+        else:
+            yield from _iter_ndjson(result)
+    finally:
+        db.close()
+
+
+def stream_rows(statement, fmt: str, bind=None) -> StreamingResponse:
+    """Stream the rows of a Core select as NDJSON or CSV, read through ``bind``
+    (the request session's engine, so replica reads stay on the replica)"""
+    return StreamingResponse(_iter_rows(statement, fmt, bind), media_type=MEDIA_TYPES[fmt])
@@ -0,0 +1,261 @@
+"""Live feed of task changes for GET /tasks/changes (server-sent events).
+
+Triggers on tasks append every insert, update, status change and delete to the
+task_changes table and send NOTIFY task_changes on commit. Each worker keeps
+one asyncpg connection that LISTENs on that channel. Every notification
+triggers one read of the new rows, which are then handed to all of that
+worker's subscribers, however many there are. A poll every
+TASK_CHANGES_POLL_SECONDS covers notifications lost while reconnecting.
+
+Ordering: ids are taken when a row is written but become visible when its
+transaction commits, so a lower id can appear after a higher one was read.
+Each row records its transaction id, and only rows of transactions older than
+every running one are read, in (xid, id) order. A row that shows up late
+therefore always sorts after everything already delivered. A long-running
+transaction anywhere on the server delays the feed, but never drops events.
+
+Each event's SSE id is its task_changes id. Clients reconnect with
+Last-Event-ID (EventSource does so by itself) and get the events they missed
+from the table, which keeps TASK_CHANGES_RETENTION_SECONDS of history. An
+unknown or pruned id gets a ``reset`` event, telling the client to reload
+instead. A subscriber that falls TASK_CHANGES_QUEUE_SIZE events behind is
+disconnected and catches up the same way.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import AsyncIterator, Awaitable, Callable, NamedTuple, Optional, Set, Tuple, TypeVar
+
+import asyncpg
+import orjson
+
+from app.database import DATABASE_URL
+from app.metrics import Exposition
+from app.serialization import JSON_OPTIONS
+
+TASK_CHANGES_RETENTION_SECONDS = int(os.getenv("TASK_CHANGES_RETENTION_SECONDS", "3600"))
+TASK_CHANGES_POLL_SECONDS = float(os.getenv("TASK_CHANGES_POLL_SECONDS", "2"))
+TASK_CHANGES_HEARTBEAT_SECONDS = float(os.getenv("TASK_CHANGES_HEARTBEAT_SECONDS", "15"))
+TASK_CHANGES_QUEUE_SIZE = int(os.getenv("TASK_CHANGES_QUEUE_SIZE", "1000"))
+
+CHANNEL = "task_changes"
+BATCH = 500
+PRUNE_SECONDS = 300
+RECONNECT_SECONDS = 1
+# Client reconnect delay sent in the stream (ms)
+RETRY_MS = 3000
+# pg_advisory lock key, so one worker at a time prunes the table
+PRUNE_LOCK = 0x7461736b  # "task"
+
+# Oldest transaction still running: every row with a lower xid is final
+HORIZON = "pg_snapshot_xmin(pg_current_snapshot())::text::bigint"
+READ = f"""
+    SELECT id, xid, op, task::text AS task, old_status_id, changed_at FROM task_changes
+    WHERE (xid, id) > ($1, $2) AND xid < {HORIZON}
+    ORDER BY xid, id LIMIT $3
+"""
+POSITION = "SELECT xid FROM task_changes WHERE id = $1"
+PRUNE = "DELETE FROM task_changes WHERE changed_at < now() - make_interval(secs => $1)"
+
+Position = Tuple[int, int]
+T = TypeVar("T")
+
+# Raised by a query on a connection that was closed or lost (not by a failing statement)
+CONNECTION_ERRORS = (OSError, asyncpg.InterfaceError, asyncpg.PostgresConnectionError, asyncpg.OperatorInterventionError)
+
+logger = logging.getLogger(__name__)
+
+
+class Change(NamedTuple):
+    key: Position
+    user_id: int
+    event: bytes
+
+    @classmethod
+    def from_row(cls, row) -> "Change":
+        task = orjson.loads(row["task"])
+        data = {**task, "changed_at": row["changed_at"]}
+        if row["old_status_id"] is not None:
+            data["old_status_id"] = row["old_status_id"]
+        event = (f"id: {row['id']}\nevent: {row['op']}\ndata: ".encode()
+                 + orjson.dumps(data, option=JSON_OPTIONS) + b"\n\n")
+        return cls((row["xid"], row["id"]), task["user_id"], event)
+
+
+class Subscriber:
+    def __init__(self, user_id: Optional[int]):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(TASK_CHANGES_QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, change: Change) -> None:
+        if self.overflowed or (self.user_id is not None and change.user_id != self.user_id):
+            return
+        try:
+            self.queue.put_nowait(change)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            # Wake the stream so it ends now rather than at the next heartbeat
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class ChangeFeed:
+    """The worker's listener connection and its subscribers"""
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self.subscribers: Set[Subscriber] = set()
+        self.position: Optional[Position] = None
+        self.conn: Optional[asyncpg.Connection] = None
+        self.connected = asyncio.Event()
+        self.wakeup = asyncio.Event()
+        # Serializes queries on the single connection
+        self.lock = asyncio.Lock()
+        self.task: Optional[asyncio.Task] = None
+        self.pruned_at = 0.0
+
+    def start(self) -> None:
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self._run(), name="task-changes")
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def collect(self, exposition: Exposition) -> None:
+        """Write this worker's feed gauges into ``exposition``"""
+        exposition.family("task_changes_connected", "gauge", "1 while the change feed's listener is connected")
+        exposition.sample("task_changes_connected", {}, int(self.connected.is_set()))
+        exposition.family("task_changes_subscribers", "gauge", "Open GET /tasks/changes streams")
+        exposition.sample("task_changes_subscribers", {}, len(self.subscribers))
+
+    # Listener
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                conn = await asyncpg.connect(self.dsn)
+            except (OSError, asyncpg.PostgresError) as e:
+                logger.warning("Task change feed cannot connect: %s", e)
+                await asyncio.sleep(RECONNECT_SECONDS)
+                continue
+            try:
+                await conn.add_listener(CHANNEL, self._notified)
+                if self.position is None:
+                    # Start at "now": everything before the horizon is history
+                    self.position = (await conn.fetchval(f"SELECT {HORIZON}"), 0)
+                self.conn = conn
+                self.connected.set()
+                while True:
+                    self.wakeup.clear()
+                    await self._broadcast(conn)
+                    await self._prune_if_due(conn)
+                    try:
+                        await asyncio.wait_for(self.wakeup.wait(), TASK_CHANGES_POLL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                logger.warning("Task change feed lost its connection: %s", e)
+                await asyncio.sleep(RECONNECT_SECONDS)
+            finally:
+                self.connected.clear()
+                self.conn = None
+                conn.terminate()
+
+    def _notified(self, conn, pid, channel, payload) -> None:
+        self.wakeup.set()
+
+    @staticmethod
+    async def _read(conn: asyncpg.Connection, position: Position) -> list:
+        return [Change.from_row(row) for row in await conn.fetch(READ, *position, BATCH)]
+
+    async def _broadcast(self, conn: asyncpg.Connection) -> None:
+        while True:
+            async with self.lock:
+                changes = await self._read(conn, self.position)
+            if changes:
+                self.position = changes[-1].key
+                for subscriber in list(self.subscribers):
+                    for change in changes:
+                        subscriber.offer(change)
+            if len(changes) < BATCH:
+                return
+
+    async def _prune_if_due(self, conn: asyncpg.Connection) -> None:
+        if time.monotonic() - self.pruned_at < PRUNE_SECONDS:
+            return
+        self.pruned_at = time.monotonic()
+        async with self.lock, conn.transaction():
+            if await conn.fetchval("SELECT pg_try_advisory_xact_lock($1)", PRUNE_LOCK):
+                await conn.execute(PRUNE, float(TASK_CHANGES_RETENTION_SECONDS))
+
+    async def _query(self, query: Callable[[asyncpg.Connection], Awaitable[T]]) -> T:
+        """Run ``query`` for a client stream on the listener connection, waiting out reconnects"""
+        while True:
+            await self.connected.wait()
+            async with self.lock:
+                conn = self.conn
+                if conn is None:  # dropped while this stream waited for the lock
+                    continue
+                try:
+                    return await query(conn)
+                except CONNECTION_ERRORS:
+                    pass
+            # Lost under this query; wake the listener so it notices and reconnects
+            self.wakeup.set()
+            await asyncio.sleep(RECONNECT_SECONDS)
+
+    # Subscribers
+
+    async def stream(self, last_event_id: Optional[int] = None, user_id: Optional[int] = None) -> AsyncIterator[bytes]:
+        """SSE messages for one client: missed events after ``last_event_id``, then live ones"""
+        self.start()
+        subscriber = Subscriber(user_id)
+        # Subscribe before reading the backlog, so nothing falls in between;
+        # live events the backlog already covered are skipped by position
+        self.subscribers.add(subscriber)
+        try:
+            yield f"retry: {RETRY_MS}\n\n".encode()
+            sent: Optional[Position] = None
+            if last_event_id is not None:
+                sent = await self._resume_position(last_event_id)
+                if sent is None:
+                    yield b"event: reset\ndata: {}\n\n"
+                else:
+                    while True:
+                        changes = await self._query(lambda conn: self._read(conn, sent))
+                        for change in changes:
+                            if user_id is None or change.user_id == user_id:
+                                yield change.event
+                        if changes:
+                            sent = changes[-1].key
+                        if len(changes) < BATCH:
+                            break
+
+            while True:
+                try:
+                    change = await asyncio.wait_for(subscriber.queue.get(), TASK_CHANGES_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": heartbeat\n\n"
+                    continue
+                if change is None:  # fell too far behind; the client resumes from the table
+                    return
+                if sent is None or change.key > sent:
+                    sent = change.key
+                    yield change.event
+        finally:
+            self.subscribers.discard(subscriber)
+
+    async def _resume_position(self, last_event_id: int) -> Optional[Position]:
+        xid = await self._query(lambda conn: conn.fetchval(POSITION, last_event_id))
+        return None if xid is None else (xid, last_event_id)
+
+
+task_changes = ChangeFeed(DATABASE_URL)
@@ -0,0 +1,73 @@
+"""Deterministic benchmark dataset, generated inside Postgres.
+
+Rows are produced with generate_series, so seeding a million tasks is a few
+INSERT ... SELECT statements with no data crossing the network. The content is
+a pure function of the requested sizes, which keeps runs comparable across
+commits. THIS EMPTIES the users and tasks tables first.
+
+    python -m benchmarks.dataset --tasks 100000
+"""
+import argparse
+import time
+
+from sqlalchemy import text
+
+from app.database import engine
+
+# Users get one of these domains, so /tasks/by-domain has a few large groups
+DOMAINS = ("example.com", "example.org", "example.net", "mail.example.com")
+
+# Tasks are inserted in chunks to keep each statement's transition table small
+CHUNK = 100_000
+
+
+def seed(tasks: int, users: int = None) -> dict:
+    """Replace users and tasks with ``users`` users and ``tasks`` tasks"""
+    users = users or max(tasks // 10, 10)
+    domains = "ARRAY[%s]" % ", ".join(f"'{domain}'" for domain in DOMAINS)
+
+    with engine.begin() as conn:
+        status_ids = conn.execute(text("SELECT id FROM status ORDER BY id")).scalars().all()
+        if not status_ids:
+            raise SystemExit("No statuses found. Migrations may not have run.")
+        statuses = "ARRAY[%s]" % ", ".join(str(status_id) for status_id in status_ids)
+
+        conn.execute(text("TRUNCATE users, tasks, task_counts_by_status, task_counts_by_user RESTART IDENTITY"))
+        # Keeps its id sequence: clients resuming with an old Last-Event-ID get a reset, not another row
+        conn.execute(text("TRUNCATE task_changes"))
+        conn.execute(text(f"""
+            INSERT INTO users (username, email)
+            SELECT 'user' || g, 'user' || g || '@' || ({domains})[1 + g % {len(DOMAINS)}]
+            FROM generate_series(1, :users) g
+        """), {"users": users})
+
+        for start in range(1, tasks + 1, CHUNK):
+            conn.execute(text(f"""
+                INSERT INTO tasks (title, description, status_id, user_id)
+                SELECT
+                    'Task ' || g,
+                    CASE WHEN g % 20 = 0 THEN NULL ELSE md5(g::text) || ' ' || md5((-g)::text) END,
+                    ({statuses})[1 + g % {len(status_ids)}],
+                    1 + (g * 7919) % :users
+                FROM generate_series(:start, :end) g
+            """), {"start": start, "end": min(start + CHUNK - 1, tasks), "users": users})
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE users"))
+        conn.execute(text("VACUUM ANALYZE tasks"))
+    return {"users": users, "tasks": tasks}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=100_000, help="e.g. 1000, 100000 or 1000000")
+    parser.add_argument("--users", type=int, default=None, help="default: tasks / 10")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    sizes = seed(args.tasks, args.users)
+    print(f"Seeded {sizes['users']} users and {sizes['tasks']} tasks in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,450 @@
+"""HTTP load benchmark for every route of the API.
+
+Starts the app with app.server on a free local port (or targets --url), drives
+it with --concurrency concurrent clients picking routes according to a
+weighted mix for --duration seconds, and prints one JSON document with, per
+route, throughput, p50/p95/p99 latency, status codes and the mean number of
+SQL statements per request (from the X-DB-Queries header). Save the output
+per commit and diff it to compare runs.
+
+    python -m benchmarks.dataset --tasks 100000
+    python -m benchmarks.load --mix read --concurrency 32 --duration 30 > before.json
+
+Everything runs on this machine: the driver, the server and the Postgres
+named by the usual POSTGRES_* variables. Write routes modify the dataset, so
+re-seed between runs that must be strictly comparable.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+from fastapi.dependencies.utils import get_flat_dependant
+from sqlalchemy import text
+
+from app.async_routes import router as async_router
+from app.database import engine
+from app.instrumentation import QUERY_COUNT_HEADER
+
+
+class Dataset(NamedTuple):
+    users: int
+    tasks: int
+    user_ids: range
+    task_ids: range
+    statuses: List[str]
+    status_ids: List[int]
+    domains: List[str]
+
+
+class Request(NamedTuple):
+    method: str
+    url: str
+    json: Optional[object] = None
+
+
+class Scenario(NamedTuple):
+    route: str
+    build: Callable[["Driver", random.Random], Request]
+
+
+def load_dataset() -> Dataset:
+    with engine.connect() as conn:
+        min_user, max_user = conn.execute(text("SELECT min(id), max(id) FROM users")).one()
+        min_task, max_task = conn.execute(text("SELECT min(id), max(id) FROM tasks")).one()
+        users, tasks = conn.execute(text("SELECT (SELECT count(*) FROM users), (SELECT count(*) FROM tasks)")).one()
+        statuses = conn.execute(text("SELECT id, name FROM status ORDER BY id")).all()
+        domains = conn.execute(text(
+            "SELECT email_domain FROM users GROUP BY email_domain ORDER BY count(*) DESC LIMIT 10"
+        )).scalars().all()
+    if max_user is None or max_task is None:
+        raise SystemExit("The database has no users or tasks; run python -m benchmarks.dataset first")
+    return Dataset(
+        users=users,
+        tasks=tasks,
+        user_ids=range(min_user, max_user + 1),
+        task_ids=range(min_task, max_task + 1),
+        statuses=[name for _, name in statuses],
+        status_ids=[status_id for status_id, _ in statuses],
+        domains=domains,
+    )
+
+
+class Driver:
+    """Request builders share the dataset bounds and the tasks created so far"""
+
+    def __init__(self, dataset: Dataset, run_id: str):
+        self.data = dataset
+        self.run_id = run_id
+        self.sequence = 0
+        self.created_task_ids: List[int] = []
+
+    def next_id(self) -> int:
+        self.sequence += 1
+        return self.sequence
+
+    def user_id(self, rng: random.Random) -> int:
+        return rng.choice(self.data.user_ids)
+
+    def task_id(self, rng: random.Random) -> int:
+        return rng.choice(self.data.task_ids)
+
+    def new_task(self, rng: random.Random) -> dict:
+        return {
+            "title": f"Load test task {self.next_id()}",
+            "description": "created by benchmarks.load",
+            "status_id": rng.choice(self.data.status_ids),
+            "user_id": self.user_id(rng),
+        }
+
+    def delete_target(self, rng: random.Random) -> int:
+        # Prefer tasks this run created so deletes keep succeeding
+        if self.created_task_ids:
+            return self.created_task_ids.pop()
+        return self.task_id(rng)
+
+
+SCENARIOS = [
+    Scenario("GET /", lambda d, r: Request("GET", "/")),
+    Scenario("GET /health", lambda d, r: Request("GET", "/health")),
+    Scenario("GET /metrics/pool", lambda d, r: Request("GET", "/metrics/pool")),
+    Scenario("GET /metrics/cache", lambda d, r: Request("GET", "/metrics/cache")),
+    Scenario("GET /metrics", lambda d, r: Request("GET", "/metrics")),
+    Scenario("GET /admin/slow-queries", lambda d, r: Request("GET", "/admin/slow-queries?limit=20")),
+    Scenario("GET /users", lambda d, r: Request("GET", f"/users?limit=100&order_by={r.choice(['id', 'email'])}")),
+    Scenario("GET /users/{id}", lambda d, r: Request("GET", f"/users/{d.user_id(r)}")),
+    Scenario("GET /users/search", lambda d, r: Request("GET", f"/users/search?q=user{r.randint(10, 999)}&limit=20")),
+    Scenario("GET /users/search/by-email",
+             lambda d, r: Request("GET", f"/users/search/by-email?pattern=user{r.randint(1, 99)}%25&limit=100")),
+    Scenario("GET /users/without-tasks", lambda d, r: Request("GET", "/users/without-tasks")),
+    Scenario("GET /users/with-task-count", lambda d, r: Request("GET", "/users/with-task-count?limit=100")),
+    Scenario("GET /users/with-in-progress-tasks", lambda d, r: Request("GET", "/users/with-in-progress-tasks")),
+    Scenario("GET /users/{id}/tasks", lambda d, r: Request("GET", f"/users/{d.user_id(r)}/tasks")),
+    # Streamed exports: latency is the time to the last row
+    Scenario("GET /users/{id}/tasks?format=ndjson",
+             lambda d, r: Request("GET", f"/users/{d.user_id(r)}/tasks?format=ndjson")),
+    Scenario("GET /users/{id}/tasks?format=csv", lambda d, r: Request("GET", f"/users/{d.user_id(r)}/tasks?format=csv")),
+    Scenario("GET /statuses", lambda d, r: Request("GET", "/statuses")),
+    Scenario("GET /tasks", lambda d, r: Request("GET", "/tasks?limit=100")),
+    # Filtered pages: (user_id, status_id, id) and (status_id, id) indexes, the partial index and the domain semi-join
+    Scenario("GET /tasks?user_id&status", lambda d, r: Request(
+        "GET", f"/tasks?user_id={d.user_id(r)}&status={r.choice(d.data.statuses)}&limit=100"
+    )),
+    Scenario("GET /tasks?user_id&exclude_status", lambda d, r: Request(
+        "GET", f"/tasks?user_id={d.user_id(r)}&exclude_status={r.choice(d.data.statuses)}&limit=100"
+    )),
+    Scenario("GET /tasks?status", lambda d, r: Request("GET", f"/tasks?status={r.choice(d.data.statuses)}&limit=100")),
+    Scenario("GET /tasks?has_description", lambda d, r: Request("GET", "/tasks?has_description=false&limit=100")),
+    Scenario("GET /tasks?domain&status", lambda d, r: Request(
+        "GET", f"/tasks?domain={r.choice(d.data.domains)}&status={r.choice(d.data.statuses)}&limit=100"
+    )),
+    Scenario("GET /tasks/{id}", lambda d, r: Request("GET", f"/tasks/{d.task_id(r)}")),
+    # Seeded titles are "Task <n>": a number matches a handful of tasks, "task" matches all of them
+    Scenario("GET /tasks/search (selective/rank)",
+             lambda d, r: Request("GET", f"/tasks/search?q={d.task_id(r)}&order=rank&limit=20")),
+    Scenario("GET /tasks/search (selective/newest)",
+             lambda d, r: Request("GET", f"/tasks/search?q={d.task_id(r)}&order=newest&limit=20")),
+    Scenario("GET /tasks/search (broad/rank)", lambda d, r: Request("GET", "/tasks/search?q=task&order=rank&limit=20")),
+    Scenario("GET /tasks/search (broad/newest)",
+             lambda d, r: Request("GET", "/tasks/search?q=task&order=newest&limit=20")),
+    Scenario("GET /tasks/by-status/{name}", lambda d, r: Request("GET", f"/tasks/by-status/{r.choice(d.data.statuses)}")),
+    Scenario("GET /tasks/by-status/{name}?format=ndjson",
+             lambda d, r: Request("GET", f"/tasks/by-status/{r.choice(d.data.statuses)}?format=ndjson")),
+    Scenario("GET /tasks/by-status/{name}?format=csv",
+             lambda d, r: Request("GET", f"/tasks/by-status/{r.choice(d.data.statuses)}?format=csv")),
+    Scenario("GET /tasks/incomplete", lambda d, r: Request("GET", "/tasks/incomplete")),
+    Scenario("GET /tasks/no-description", lambda d, r: Request("GET", "/tasks/no-description")),
+    Scenario("GET /tasks/by-domain", lambda d, r: Request("GET", f"/tasks/by-domain?domain={r.choice(d.data.domains)}")),
+    Scenario("GET /stats/tasks-by-status", lambda d, r: Request("GET", "/stats/tasks-by-status")),
+    Scenario("POST /users", lambda d, r: Request(
+        "POST", "/users", {"username": "loadtest", "email": f"load-{d.run_id}-{d.next_id()}@bench.example.com"}
+    )),
+    Scenario("PUT /users/{id}", lambda d, r: Request(
+        "PUT", f"/users/{d.user_id(r)}", {"username": f"renamed{d.next_id()}"}
+    )),
+    Scenario("POST /tasks", lambda d, r: Request("POST", "/tasks", d.new_task(r))),
+    Scenario("POST /tasks/bulk", lambda d, r: Request(
+        "POST", "/tasks/bulk", [d.new_task(r) for _ in range(100)]
+    )),
+    Scenario("PUT /tasks/{id}", lambda d, r: Request(
+        "PUT", f"/tasks/{d.task_id(r)}", {"title": f"Updated {d.next_id()}"}
+    )),
+    Scenario("PATCH /tasks/{id}/status", lambda d, r: Request(
+        "PATCH", f"/tasks/{d.task_id(r)}/status", {"status_id": r.choice(d.data.status_ids)}
+    )),
+    Scenario("PATCH /tasks/bulk/status", lambda d, r: Request(
+        "PATCH", "/tasks/bulk/status", {"task_ids": r.sample(d.data.task_ids, 50), "status_id": r.choice(d.data.status_ids)}
+    )),
+    Scenario("DELETE /tasks/{id}", lambda d, r: Request("DELETE", f"/tasks/{d.delete_target(r)}")),
+    Scenario("POST /statuses/refresh", lambda d, r: Request("POST", "/statuses/refresh")),
+    # GET /tasks/changes is left out: an SSE stream stays open until the client
+    # leaves, so it has no request latency to record
+]
+
+ASYNC_PREFIX = async_router.prefix
+
+
+def route_key(method: str, path: str) -> Tuple[str, str]:
+    """Method and path template without parameter names, e.g. ("GET", "/users/{}")"""
+    return method, re.sub(r"\{[^}]*\}", "{}", path)
+
+
+# Query parameters accepted per route of the async handlers
+ASYNC_ROUTES: Dict[Tuple[str, str], set] = {
+    route_key(method, route.path.removeprefix(ASYNC_PREFIX)):
+        {param.alias for param in get_flat_dependant(route.dependant).query_params}
+    for route in async_router.routes for method in route.methods
+}
+
+
+def mirrored(route: str) -> bool:
+    """Whether the async handlers serve a scenario, query parameters in its name included"""
+    method, target = route.split()[:2]
+    path, _, query = target.partition("?")
+    accepted = ASYNC_ROUTES.get(route_key(method, path))
+    return accepted is not None and {item.partition("=")[0] for item in query.split("&") if item} <= accepted
+
+
+# Relative weights per mix; routes not listed are not exercised
+MIXES: Dict[str, Dict[str, float]] = {
+    "all": {scenario.route: 1 for scenario in SCENARIOS},
+    "read": {
+        "GET /users": 5, "GET /users/{id}": 20, "GET /users/search": 3, "GET /users/search/by-email": 2,
+        "GET /users/with-task-count": 2, "GET /users/{id}/tasks": 15, "GET /statuses": 5, "GET /tasks": 10,
+        "GET /users/{id}/tasks?format=ndjson": 1, "GET /users/{id}/tasks?format=csv": 1,
+        "GET /tasks/{id}": 30, "GET /tasks/by-domain": 1, "GET /stats/tasks-by-status": 5,
+        "GET /tasks?user_id&status": 5, "GET /tasks?user_id&exclude_status": 3, "GET /tasks?status": 3,
+        "GET /tasks?has_description": 1, "GET /tasks?domain&status": 1,
+        "GET /tasks/search (selective/rank)": 2, "GET /tasks/search (selective/newest)": 1,
+        "GET /tasks/search (broad/rank)": 0.5, "GET /tasks/search (broad/newest)": 1,
+        # as scraped by a monitoring system
+        "GET /metrics": 0.5, "GET /admin/slow-queries": 0.2,
+    },
+    "write": {
+        "POST /users": 5, "PUT /users/{id}": 5, "POST /tasks": 40, "POST /tasks/bulk": 2, "PUT /tasks/{id}": 20,
+        "PATCH /tasks/{id}/status": 20, "PATCH /tasks/bulk/status": 2, "DELETE /tasks/{id}": 10,
+    },
+}
+MIXES["mixed"] = {
+    **{route: weight * 4 for route, weight in MIXES["read"].items()},
+    **MIXES["write"],
+}
+
+
+def parse_weights(mix: str, overrides: Optional[str]) -> Dict[str, float]:
+    weights = dict(MIXES[mix])
+    for item in filter(None, (overrides or "").split(",")):
+        route, _, weight = item.rpartition("=")
+        if route not in {scenario.route for scenario in SCENARIOS}:
+            raise SystemExit(f"Unknown route in --weights: {route!r}")
+        weights[route] = float(weight)
+    return {route: weight for route, weight in weights.items() if weight > 0}
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.queries: Dict[str, List[int]] = defaultdict(list)
+        self.failures: Counter = Counter()
+
+    def record(self, route: str, seconds: float, response: httpx.Response) -> None:
+        self.latencies[route].append(seconds * 1000)
+        self.statuses[route][response.status_code] += 1
+        count = response.headers.get(QUERY_COUNT_HEADER)
+        if count is not None:
+            self.queries[route].append(int(count))
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return round(sorted_values[index], 2)
+
+
+def summarize(samples: List[float], statuses: Counter, queries: List[int], elapsed: float) -> dict:
+    samples = sorted(samples)
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 1),
+        "latency_ms": {
+            "p50": percentile(samples, 0.50),
+            "p95": percentile(samples, 0.95),
+            "p99": percentile(samples, 0.99),
+            "max": round(samples[-1], 2),
+            "mean": round(sum(samples) / len(samples), 2),
+        },
+        "status_codes": {str(code): count for code, count in sorted(statuses.items())},
+        "db_queries_per_request": round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+async def client_loop(client: httpx.AsyncClient, driver: Driver, scenarios: List[Scenario], weights: List[float],
+                      rng: random.Random, recorder: Optional[Recorder], deadline: float, bust_cache: bool) -> None:
+    while time.perf_counter() < deadline:
+        scenario = rng.choices(scenarios, weights)[0]
+        request = scenario.build(driver, rng)
+        url = request.url
+        if bust_cache and request.method == "GET":
+            url += ("&" if "?" in url else "?") + f"_bust={driver.next_id()}"
+        start = time.perf_counter()
+        try:
+            response = await client.request(request.method, url, json=request.json)
+        except httpx.HTTPError as e:
+            if recorder is not None:
+                recorder.failures[f"{scenario.route}: {type(e).__name__}"] += 1
+            continue
+        if recorder is not None:
+            recorder.record(scenario.route, time.perf_counter() - start, response)
+        if scenario.route == "POST /tasks" and response.status_code == 201:
+            driver.created_task_ids.append(response.json()["id"])
+
+
+async def run_phase(base_url: str, driver: Driver, weights: Dict[str, float], concurrency: int, seconds: float,
+                    seed: int, recorder: Optional[Recorder], prefix: str, bust_cache: bool) -> float:
+    scenarios = [scenario for scenario in SCENARIOS if scenario.route in weights]
+    if prefix:
+        scenarios = [s._replace(build=lambda d, r, build=s.build: prefixed(build(d, r), prefix)) for s in scenarios]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        deadline = start + seconds
+        await asyncio.gather(*(
+            client_loop(client, driver, scenarios, [weights[s.route] for s in scenarios],
+                        random.Random(seed * 1000 + i), recorder, deadline, bust_cache)
+            for i in range(concurrency)
+        ))
+        return time.perf_counter() - start
+
+
+def prefixed(request: Request, prefix: str) -> Request:
+    return request._replace(url=prefix + request.url)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int) -> Tuple[subprocess.Popen, str]:
+    port = free_port()
+    env = {
+        **os.environ,
+        "DB_QUERY_COUNT_HEADER": "true",
+        # Every request comes from 127.0.0.1; the limiter would throttle the benchmark itself
+        "RATE_LIMIT_CALLS": os.getenv("BENCH_RATE_LIMIT_CALLS", "1000000000"),
+        # The production launcher, with an explicit worker count (still capped by the connection budget)
+        "BIND": f"127.0.0.1:{port}",
+        "WEB_CONCURRENCY": str(workers),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.server"], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit("The server exited during startup")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return server, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("The server did not become healthy within 30s")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="benchmark a running server instead of starting one")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for the started server (app.server)")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent client connections")
+    parser.add_argument("--duration", type=float, default=20, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="unmeasured seconds before the run")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--weights", help="override weights, e.g. 'GET /tasks=10,DELETE /tasks/{id}=0'")
+    parser.add_argument("--prefix", default="", choices=["", ASYNC_PREFIX],
+                        help=f"{ASYNC_PREFIX} to drive the async handlers; routes they do not serve are skipped")
+    parser.add_argument("--no-cache", action="store_true", help="defeat the response cache with unique query strings")
+    parser.add_argument("--seed", type=int, default=1, help="RNG seed for the request sequence")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    weights = parse_weights(args.mix, args.weights)
+    skipped = []
+    if args.prefix:
+        skipped = sorted(route for route in weights if not mirrored(route))
+        weights = {route: weight for route, weight in weights.items() if route not in skipped}
+        if not weights:
+            raise SystemExit(f"None of the selected routes is served under {args.prefix}")
+    dataset = load_dataset()
+    driver = Driver(dataset, run_id=f"{int(time.time())}-{os.getpid()}")
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        server, base_url = start_server(args.workers)
+    try:
+        if args.warmup:
+            asyncio.run(run_phase(base_url, driver, weights, args.concurrency, args.warmup, args.seed + 1,
+                                  None, args.prefix, args.no_cache))
+        recorder = Recorder()
+        elapsed = asyncio.run(run_phase(base_url, driver, weights, args.concurrency, args.duration, args.seed,
+                                        recorder, args.prefix, args.no_cache))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    all_samples = [sample for samples in recorder.latencies.values() for sample in samples]
+    report = {
+        "commit": git_commit(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {
+            **{key: value for key, value in vars(args).items() if key != "output"},
+            "weights": weights,
+            "skipped_routes": skipped,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "dataset": {"users": dataset.users, "tasks": dataset.tasks},
+        "elapsed_s": round(elapsed, 2),
+        "total": summarize(all_samples, sum(recorder.statuses.values(), Counter()),
+                           [q for queries in recorder.queries.values() for q in queries], elapsed)
+        if all_samples else None,
+        "routes": {
+            route: summarize(recorder.latencies[route], recorder.statuses[route], recorder.queries[route], elapsed)
+            for route in sorted(recorder.latencies)
+        },
+        "failures": dict(recorder.failures),
+    }
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
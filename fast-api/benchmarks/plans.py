@@ -0,0 +1,82 @@
+"""EXPLAIN the hot read queries against the current database.
+
+Builds each statement the way its route does (app.queries.task_filters,
+user_search and the status cache) and prints its plan, so index changes can
+be checked against a seeded dataset. Plans depend on table size and statistics, so seed
+first (make bench-seed TASKS=1000000) and run ANALYZE after large changes.
+The queries are read-only; with --analyze (default) they are executed.
+
+    python -m benchmarks.plans
+    python -m benchmarks.plans --no-analyze --only no-description
+"""
+import argparse
+import logging
+
+from sqlalchemy import select
+
+from app import models
+from app.database import engine
+from app.pagination import keyset_page
+from app.queries import TASK_COLUMNS, USER_COLUMNS, task_filters, user_search
+from app.status_cache import status_cache
+
+# Page size the paged queries are explained with (limit + lookahead row)
+PAGE = 101
+
+
+def search_page(q: str, field: str):
+    """First page of GET /users/search"""
+    criterion, rank = user_search(q, field)
+    ordering = [(rank, True), (models.User.id, False)]
+    return keyset_page(select(*USER_COLUMNS, rank).where(criterion), ordering, "users:search", PAGE - 1)
+
+
+def queries(user_id: int, search: str) -> dict:
+    """Statement per route, named after it"""
+    in_progress = status_cache.select(include=["in progress"])
+    incomplete = status_cache.select(exclude=["completed"])
+    tasks = select(*TASK_COLUMNS)
+    return {
+        "incomplete": tasks.where(*task_filters(status_ids=incomplete)),
+        "no-description": tasks.where(*task_filters(has_description=False)),
+        # as in GET /users/with-in-progress-tasks
+        "users-in-progress": select(models.User.username, models.Task.title, models.Task.description)
+        .join(models.Task, models.User.id == models.Task.user_id)
+        .where(*task_filters(status_ids=in_progress)),
+        "page-in-progress": tasks.where(*task_filters(status_ids=in_progress))
+        .order_by(models.Task.id).limit(PAGE),
+        "page-user-incomplete": tasks.where(*task_filters(user_id=user_id, status_ids=incomplete))
+        .order_by(models.Task.id).limit(PAGE),
+        # The trigram indexes must serve the escaped ILIKE, wildcards in q included
+        "user-search-email": search_page(search, "email"),
+        "user-search-any": search_page(search, "any"),
+        "user-search-escaped": search_page(f"{search[:1]}_{search[1:]}%", "email"),
+    }
+
+
+def explain(statement, analyze: bool) -> str:
+    compiled = statement.compile(dialect=engine.dialect, compile_kwargs={"render_postcompile": True})
+    options = "ANALYZE, BUFFERS" if analyze else "COSTS"
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN ({options}) {compiled}", compiled.params).scalars()
+        return "\n".join(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--no-analyze", dest="analyze", action="store_false", help="plan only, do not run")
+    parser.add_argument("--only", nargs="+", help="query names to explain (default: all)")
+    parser.add_argument("--user-id", type=int, default=1, help="user of the per-user query")
+    parser.add_argument("--search", default="wang", help="term of the user-search queries")
+    args = parser.parse_args()
+    # EXPLAIN ANALYZE of a slow query is itself slow; it needs no slow-query log entry
+    logging.getLogger("app.slow_queries").setLevel(logging.ERROR)
+
+    for name, statement in queries(args.user_id, args.search).items():
+        if args.only and name not in args.only:
+            continue
+        print(f"== {name}\n{explain(statement, args.analyze)}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Microbenchmark for the FastAPI-level rate limiter.
+
+Replays a request stream spread over N distinct client addresses and reports
+per-request overhead and retained memory for the sliding-window limiter (both
+backends) next to the previous list-of-timestamps implementation.
+
+    python -m benchmarks.rate_limiter --clients 10000 --requests 500000
+"""
+import argparse
+import itertools
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+from app.rate_limit import MemoryBackend, RateLimiter, SharedMemoryBackend
+
+
+class TimestampListLimiter:
+    """The original implementation: one timestamp per request per client"""
+
+    def __init__(self, calls: int, period: int):
+        self.calls = calls
+        self.period = period
+        self.requests = defaultdict(list)
+
+    def hit(self, key: str, now: float):
+        self.requests[key] = [t for t in self.requests[key] if now - t < self.period]
+        if len(self.requests[key]) >= self.calls:
+            return self.period
+        self.requests[key].append(now)
+        return None
+
+
+def replay(limiter, keys, timestamps) -> int:
+    limited = 0
+    for key, now in zip(keys, timestamps):
+        if limiter.hit(key, now) is not None:
+            limited += 1
+    return limited
+
+
+def run(factory, keys, timestamps) -> dict:
+    # Timing and memory are measured on separate runs; tracemalloc slows every allocation
+    start = time.perf_counter()
+    limited = replay(factory(), keys, timestamps)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    limiter = factory()
+    replay(limiter, keys, timestamps)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "ns_per_request": round(elapsed / len(keys) * 1e9),
+        "retained_kib": round(current / 1024),
+        "limited": limited,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=500_000)
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--period", type=int, default=60)
+    parser.add_argument("--duration", type=float, default=120.0, help="simulated seconds the stream spans")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    addresses = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(args.clients)]
+    # Skewed traffic: a few hot clients near the limit, a long tail of rare ones
+    keys = rng.choices(addresses, weights=[1 / (i + 1) for i in range(args.clients)], k=args.requests)
+    step = args.duration / args.requests
+    timestamps = [1_700_000_000 + i * step for i in range(args.requests)]
+
+    print(f"{args.requests} requests from {args.clients} clients, limit {args.calls}/{args.period}s")
+    with tempfile.TemporaryDirectory(prefix="ratelimit-bench-") as shm_dir:
+        # A new table file per run, so the memory run does not start with the timing run's counters
+        shm_files = (os.path.join(shm_dir, str(i)) for i in itertools.count())
+        for name, factory in (
+            ("timestamp-list", lambda: TimestampListLimiter(args.calls, args.period)),
+            ("memory", lambda: RateLimiter(args.calls, args.period, MemoryBackend(args.clients * 2))),
+            ("shared", lambda: RateLimiter(
+                args.calls, args.period, SharedMemoryBackend(next(shm_files), args.clients * 2)
+            )),
+        ):
+            result = run(factory, keys, timestamps)
+            print(f"  {name:15} {result['ns_per_request']:>7} ns/request  "
+                  f"retained {result['retained_kib']:>7} KiB  limited {result['limited']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Throughput against the number of server workers.
+
+Runs benchmarks.load once per worker count, each against a freshly started
+app.server, and prints requests/s and latency side by side. The load driver
+shares the machine, so leave it some cores: on an N-core host, sweep up to
+about N - 2 workers.
+
+    python -m benchmarks.scaling --workers 1 2 4 8 --mix read --duration 20
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+
+def run(workers: int, extra: list) -> dict:
+    with tempfile.NamedTemporaryFile(suffix=".json") as output:
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.load", "--workers", str(workers), "--output", output.name, *extra],
+            check=True, stdout=subprocess.DEVNULL,
+        )
+        with open(output.name) as f:
+            return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args, extra = parser.parse_known_args()
+
+    print(f"{os.cpu_count()} CPUs; benchmarks.load {' '.join(extra)}")
+    print(f"{'workers':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'non-2xx':>8} {'speedup':>8}")
+    baseline = None
+    for workers in args.workers:
+        total = run(workers, extra)["total"]
+        rps = total["throughput_rps"]
+        baseline = baseline or rps
+        errors = sum(count for code, count in total["status_codes"].items() if not code.startswith("2"))
+        print(f"{workers:>7} {rps:>9} {total['latency_ms']['p50']:>8} {total['latency_ms']['p99']:>8} "
+              f"{errors:>8} {rps / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Benchmark for the JSON path of list endpoints.
+
+Requests GET /tasks?limit=N in-process and reports the median latency next to
+the previous implementation (ORM objects validated through response_model and
+encoded with the stdlib encoder), plus the bare query time, so the share spent
+on serialization is visible. Needs a database with at least N tasks.
+
+    python -m benchmarks.serialization --sizes 100 1000 10000 --repeat 20
+"""
+import argparse
+import os
+import statistics
+import time
+from typing import List
+
+# Nothing is stored in the response cache, so every request runs the handler
+os.environ.setdefault("RESPONSE_CACHE_MAX_ENTRY_BYTES", "1")
+os.environ.setdefault("RATE_LIMIT_CALLS", "1000000000")
+
+from fastapi import Depends, FastAPI, Query
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.database import SessionLocal, get_db
+from app.main import app
+from app.queries import TASK_COLUMNS
+
+legacy_app = FastAPI()
+
+
+@legacy_app.get("/tasks", response_model=List[schemas.Task])
+def legacy_get_tasks(limit: int = Query(100, ge=1), db: Session = Depends(get_db)):
+    """The original handler: ORM objects, response_model validation, stdlib json"""
+    return db.query(models.Task).order_by(models.Task.id).limit(limit + 1).all()[:limit]
+
+
+def median_ms(call, repeat: int) -> float:
+    call()  # warm up pools and caches
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples) * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    with TestClient(app) as client, TestClient(legacy_app) as legacy_client:
+        print(f"{'rows':>6} {'query ms':>9} {'before ms':>10} {'after ms':>9} {'speedup':>8}")
+        for size in args.sizes:
+            statement = select(*TASK_COLUMNS).order_by(models.Task.id).limit(size + 1)
+            query = median_ms(lambda: db.execute(statement).all(), args.repeat)
+            before = median_ms(lambda: legacy_client.get(f"/tasks?limit={size}").raise_for_status(), args.repeat)
+            after = median_ms(lambda: client.get(f"/tasks?limit={size}").raise_for_status(), args.repeat)
+            print(f"{size:>6} {query:>9} {before:>10} {after:>9} {before / after:>7.1f}x")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Rebuild the task counter tables from the tasks table.
+
+The counters are kept current by triggers, so this is only needed after
+manual data fixes, trigger changes or any suspicion of drift. Writers to tasks
+are blocked while it runs; readers are not.
+
+Usage: python -m migrations.reconcile_counters
+"""
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+
+COUNTERS = (
+    ("task_counts_by_status", "status_id"),
+    ("task_counts_by_user", "user_id"),
+)
+
+
+def reconcile(db: Session, table: str, key: str) -> int:
+    """Rebuild one counter table; returns how many counters were wrong"""
+    drifted = db.execute(text(f"""
+        SELECT count(*)
+        FROM {table} c
+        FULL JOIN (SELECT {key}, count(*) AS task_count FROM tasks GROUP BY {key}) t USING ({key})
+        WHERE coalesce(c.task_count, 0) <> coalesce(t.task_count, 0)
+    """)).scalar()
+
+    db.execute(text(f"DELETE FROM {table}"))
+    db.execute(text(f"""
+        INSERT INTO {table} ({key}, task_count)
+        SELECT {key}, count(*) FROM tasks GROUP BY {key}
+    """))
+    return drifted
+
+
+def main():
+    """Recount every counter in one transaction"""
+    print("Reconciling task counters...")
+
+    db = SessionLocal()
+    try:
+        # SHARE mode stops inserts/updates/deletes on tasks until commit, so no
+        # trigger can adjust a counter between the recount and the rewrite
+        db.execute(text("LOCK TABLE tasks IN SHARE MODE"))
+        for table, key in COUNTERS:
+            drifted = reconcile(db, table, key)
+            print(f"{table}: {drifted} counters corrected")
+        db.commit()
+        print("Reconciliation completed!")
+
+    except Exception as e:
+        db.rollback()
+        print(f"Error reconciling counters: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,85 +1,200 @@
-"""Seed data script to replace seed.py"""
-from faker import Faker
-from sqlalchemy.orm import Session
-from app.database import SessionLocal
-from app.models import User, Status, Task
+"""Seed the database with generated users and tasks.
+
+Rows are generated by worker processes and streamed into Postgres with COPY,
+one transaction per batch, so memory use is flat however many rows are
+requested. Task foreign keys are sampled from the id ranges present in the
+database instead of from loaded rows. The generated data depends only on
+--seed and --batch-size, not on the number of workers.
+
+Usage:
+    python -m migrations.seed                       # 10 users, 30 tasks
+    python -m migrations.seed --users 1000000 --tasks 10000000 --workers 8
+"""
+import argparse
+import bisect
+import io
 import random
+import time
+from itertools import accumulate
+from multiprocessing import Pool
+from multiprocessing.util import Finalize
+from typing import List, Optional, Sequence, Tuple
 
-fake = Faker()
+import psycopg2
+from faker.providers.internet.en_US import Provider as InternetProvider
+from faker.providers.lorem.en_US import Provider as LoremProvider
+from faker.providers.person.en_US import Provider as PersonProvider
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
 
+from app.database import DATABASE_URL, engine
 
-def seed_users(db: Session, count: int = 10):
-    """Generate and insert random users"""
-    print(f"Seeding {count} users...")
-    users = []
-    for _ in range(count):
-        user = User(
-            username=fake.user_name(),
-            email=fake.email()
+# Faker's own word lists, sampled directly: building Faker objects row by row
+# costs ~200us per task, which dominates at millions of rows. None of these
+# words contain tabs, newlines or backslashes, so no COPY escaping is needed.
+FIRST_NAMES = tuple(name.lower() for name in PersonProvider.first_names)
+LAST_NAMES = tuple(name.lower() for name in PersonProvider.last_names)
+EMAIL_DOMAINS = InternetProvider.free_email_domains
+WORDS = LoremProvider.word_list
+
+COPY_USERS = "COPY users (id, username, email) FROM STDIN"
+COPY_TASKS = "COPY tasks (title, description, status_id, user_id) FROM STDIN"
+
+IdRanges = Sequence[Tuple[int, int]]
+
+
+class IdSampler:
+    """Uniform choice among ids given as contiguous (first, last) ranges"""
+
+    def __init__(self, ranges: IdRanges):
+        self.firsts = [first for first, _ in ranges]
+        self.ends = list(accumulate(last - first + 1 for first, last in ranges))
+        self.total = self.ends[-1]
+
+    def __call__(self, rng: random.Random) -> int:
+        n = rng.randrange(self.total)
+        run = bisect.bisect_right(self.ends, n)
+        return self.firsts[run] + n - (self.ends[run - 1] if run else 0)
+
+
+def id_ranges(conn: Connection, table: str) -> List[Tuple[int, int]]:
+    """The contiguous runs of ids in ``table``, read from its primary key index"""
+    return [tuple(row) for row in conn.execute(text(f"""
+        SELECT min(id), max(id)
+        FROM (SELECT id, id - row_number() OVER (ORDER BY id) AS run FROM {table}) ids
+        GROUP BY run
+        ORDER BY 1
+    """))]
+
+
+def reserve_user_ids(conn: Connection, count: int) -> int:
+    """Move the users id sequence past ``count`` ids; returns the first one"""
+    # Inserts take ROW EXCLUSIVE, so nobody can draw an id in between
+    conn.execute(text("LOCK TABLE users IN SHARE ROW EXCLUSIVE MODE"))
+    last = conn.execute(text("""
+        SELECT setval(
+            pg_get_serial_sequence('users', 'id'),
+            greatest(nextval(pg_get_serial_sequence('users', 'id')) - 1, (SELECT coalesce(max(id), 0) FROM users))
+                + :count
         )
-        users.append(user)
-    
-    db.bulk_save_objects(users)
-    db.commit()
-    print(f"{count} users seeded")
-
-
-def seed_tasks(db: Session, count: int = 30):
-    """Generate and insert random tasks"""
-    print(f"Seeding {count} tasks...")
-    
-    users = db.query(User).all()
-    statuses = db.query(Status).all()
-    
-    if not users:
-        print("No users found. Please seed users first.")
-        return
-    
-    if not statuses:
-        print("No statuses found. Migration may not have run.")
-        return
-    
-    tasks = []
+    """), {"count": count}).scalar()
+    return last - count + 1
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choices(WORDS, k=words)).capitalize()
+
+
+def user_rows(rng: random.Random, first_id: int, count: int):
+    for user_id in range(first_id, first_id + count):
+        username = rng.choice(FIRST_NAMES) + rng.choice(LAST_NAMES)
+        # The id keeps emails unique at any volume
+        yield f"{user_id}\t{username}\t{username}.{user_id}@{rng.choice(EMAIL_DOMAINS)}\n"
+
+
+def task_rows(rng: random.Random, count: int, users: IdSampler, statuses: IdSampler):
     for _ in range(count):
-        task = Task(
-            title=fake.sentence(nb_words=4).rstrip('.'),
-            description=fake.text(max_nb_chars=200),
-            status_id=random.choice(statuses).id,
-            user_id=random.choice(users).id
-        )
-        tasks.append(task)
-    
-    db.bulk_save_objects(tasks)
-    db.commit()
-    print(f"{count} tasks seeded")
+        description = " ".join(sentence(rng, rng.randint(4, 10)) + "." for _ in range(rng.randint(2, 4)))
+        yield f"{sentence(rng, 4)}\t{description}\t{statuses(rng)}\t{users(rng)}\n"
+
+
+# Per-process state, set up by the pool initializer
+_worker = {}
+
+
+def init_worker(seed: int, users: Optional[IdRanges], statuses: IdRanges):
+    _worker["seed"] = seed
+    _worker["users"] = IdSampler(users) if users else None
+    _worker["statuses"] = IdSampler(statuses)
+    _worker["conn"] = psycopg2.connect(DATABASE_URL)
+    Finalize(None, _worker["conn"].close, exitpriority=10)
+
+
+def copy_batch(job: Tuple[str, int, int, int]) -> int:
+    """Generate one batch and COPY it in its own transaction"""
+    table, batch, first, count = job
+    rng = random.Random(f"{_worker['seed']}:{table}:{batch}")
+    if table == "users":
+        rows, statement = user_rows(rng, first, count), COPY_USERS
+    else:
+        rows, statement = task_rows(rng, count, _worker["users"], _worker["statuses"]), COPY_TASKS
+
+    buffer = io.StringIO()
+    buffer.writelines(rows)
+    buffer.seek(0)
+    conn = _worker["conn"]
+    with conn.cursor() as cursor:
+        cursor.copy_expert(statement, buffer)
+    conn.commit()
+    return count
+
+
+def batches(table: str, total: int, batch_size: int, first: int = 1):
+    for batch, offset in enumerate(range(0, total, batch_size)):
+        yield table, batch, first + offset, min(batch_size, total - offset)
+
+
+def load(table: str, jobs, workers: int, initargs) -> None:
+    """Run ``jobs`` on ``workers`` processes and report the load rate"""
+    start = time.perf_counter()
+    rows = 0
+    with Pool(workers, initializer=init_worker, initargs=initargs) as pool:
+        for count in pool.imap_unordered(copy_batch, jobs):
+            rows += count
+        pool.close()
+        pool.join()
+    elapsed = time.perf_counter() - start
+    print(f"{rows} {table} seeded in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
 
 
 def main():
     """Main function to seed database"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10, help="users to add (default: 10)")
+    parser.add_argument("--tasks", type=int, default=30, help="tasks to add (default: 30)")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="rows per COPY and transaction")
+    parser.add_argument("--workers", type=int, default=4, help="generator processes, each with one connection")
+    parser.add_argument("--seed", type=int, default=0, help="RNG seed; the same seed gives the same rows")
+    args = parser.parse_args()
+
     print("Starting database seeding...")
-    
-    db = SessionLocal()
-    try:
-        seed_users(db, count=10)
-        seed_tasks(db, count=30)
-        
-        user_count = db.query(User).count()
-        status_count = db.query(Status).count()
-        task_count = db.query(Task).count()
-        
-        print("Database seeding completed!")
-        print(f"Total users: {user_count}")
-        print(f"Total statuses: {status_count}")
-        print(f"Total tasks: {task_count}")
-        
-    except Exception as e:
-        db.rollback()
-        print(f"Error seeding database: {e}")
-        raise
-    finally:
-        db.close()
+    start = time.perf_counter()
+
+    with engine.begin() as conn:
+        statuses = id_ranges(conn, "status")
+        if not statuses:
+            raise SystemExit("No statuses found. Migration may not have run.")
+        first_user = reserve_user_ids(conn, args.users) if args.users else None
+    # Forked workers must not share the parent's pooled connections
+    engine.dispose()
+
+    if args.users:
+        jobs = batches("users", args.users, args.batch_size, first_user)
+        load("users", jobs, args.workers, (args.seed, None, statuses))
+
+    if args.tasks:
+        with engine.connect() as conn:
+            users = id_ranges(conn, "users")
+        engine.dispose()
+        if not users:
+            raise SystemExit("No users found. Please seed users first.")
+        jobs = batches("tasks", args.tasks, args.batch_size)
+        load("tasks", jobs, args.workers, (args.seed, users, statuses))
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE users, tasks"))
+        totals = conn.execute(text(
+            "SELECT (SELECT count(*) FROM users), (SELECT count(*) FROM status), (SELECT count(*) FROM tasks)"
+        )).one()
+
+    rows = args.users + args.tasks
+    elapsed = time.perf_counter() - start
+    print("Database seeding completed!")
+    print(f"{rows} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+    print(f"Total users: {totals[0]}")
+    print(f"Total statuses: {totals[1]}")
+    print(f"Total tasks: {totals[2]}")
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,34 @@
+"""add email_domain to users
+
+Revision ID: 5b1e7c2d9a40
+Revises: 3809dce2527a
+Create Date: 2026-10-17 09:12:05.412907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1e7c2d9a40'
+down_revision = '3809dce2527a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Stored generated column: Postgres keeps it in sync with email, and adding
+    # it rewrites users once to fill existing rows
+    op.add_column('users', sa.Column(
+        'email_domain',
+        sa.String(100),
+        sa.Computed("lower(split_part(email, '@', 2))", persisted=True),
+        nullable=False,
+    ))
+    # id is included so /tasks/by-domain can find user ids with an index-only scan
+    op.create_index('ix_users_email_domain', 'users', ['email_domain', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_email_domain', table_name='users')
+    op.drop_column('users', 'email_domain')
@@ -0,0 +1,32 @@
+"""add composite indexes to tasks
+
+Revision ID: 63a19515ceed
+Revises: ffb0b1b754fb
+Create Date: 2026-10-17 12:08:37.640219
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '63a19515ceed'
+down_revision = 'ffb0b1b754fb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # GET /tasks filters: a user's tasks in some statuses, or all tasks in a
+    # status, as one index range scan already in id (page) order. They replace
+    # the single-column indexes, which are their leading columns.
+    op.create_index('ix_tasks_user_status', 'tasks', ['user_id', 'status_id', 'id'])
+    op.create_index('ix_tasks_status', 'tasks', ['status_id', 'id'])
+    op.drop_index('ix_tasks_user_id', table_name='tasks')
+    op.drop_index('ix_tasks_status_id', table_name='tasks')
+
+
+def downgrade() -> None:
+    op.create_index('ix_tasks_status_id', 'tasks', ['status_id'])
+    op.create_index('ix_tasks_user_id', 'tasks', ['user_id'])
+    op.drop_index('ix_tasks_status', table_name='tasks')
+    op.drop_index('ix_tasks_user_status', table_name='tasks')
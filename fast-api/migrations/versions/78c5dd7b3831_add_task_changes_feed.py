@@ -0,0 +1,102 @@
+"""add task_changes feed
+
+Revision ID: 78c5dd7b3831
+Revises: c2d4ead53e51
+Create Date: 2026-10-17 13:22:40.905117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '78c5dd7b3831'
+down_revision = 'c2d4ead53e51'
+branch_labels = None
+depends_on = None
+
+
+# Every change to tasks is appended to task_changes by statement-level
+# triggers, one row per task, and the writing transaction sends one NOTIFY
+# task_changes when it commits. The table is the source of truth (and what
+# clients resume from); the notification only wakes the listeners up.
+#
+# xid is the writing transaction's id. Readers only take rows whose
+# transaction is older than every running one, so a row that commits late
+# with a lower id is never skipped (see app.task_changes).
+
+TASK = ("jsonb_build_object('id', {r}.id, 'title', {r}.title, 'description', {r}.description, "
+        "'status_id', {r}.status_id, 'user_id', {r}.user_id)")
+
+CHANGES = {
+    'insert': f"""
+        SELECT 'insert', {TASK.format(r='n')}, NULL::integer
+        FROM new_rows n ORDER BY n.id
+    """,
+    # Updates that changed nothing are skipped; a changed status is its own
+    # kind of event, carrying the previous status
+    'update': f"""
+        SELECT CASE WHEN n.status_id <> o.status_id THEN 'status' ELSE 'update' END,
+               {TASK.format(r='n')},
+               CASE WHEN n.status_id <> o.status_id THEN o.status_id END
+        FROM new_rows n JOIN old_rows o ON o.id = n.id
+        WHERE (n.title, n.description, n.status_id, n.user_id)
+              IS DISTINCT FROM (o.title, o.description, o.status_id, o.user_id)
+        ORDER BY n.id
+    """,
+    'delete': f"""
+        SELECT 'delete', {TASK.format(r='o')}, NULL::integer
+        FROM old_rows o ORDER BY o.id
+    """,
+}
+
+TRANSITION_TABLES = {
+    'insert': "NEW TABLE AS new_rows",
+    'update': "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    'delete': "OLD TABLE AS old_rows",
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        'task_changes',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('xid', sa.BigInteger(), nullable=False),
+        sa.Column('op', sa.String(10), nullable=False),
+        sa.Column('task', postgresql.JSONB(), nullable=False),
+        sa.Column('old_status_id', sa.Integer(), nullable=True),
+        sa.Column('changed_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    # Readers page by (xid, id); pruning by time, which follows insertion
+    # order, needs only a tiny BRIN index
+    op.create_index('ix_task_changes_xid_id', 'task_changes', ['xid', 'id'])
+    op.create_index('ix_task_changes_changed_at', 'task_changes', ['changed_at'], postgresql_using='brin')
+
+    for event, changes in CHANGES.items():
+        op.execute(f"""
+            CREATE FUNCTION task_changes_after_{event}() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                INSERT INTO task_changes (xid, op, task, old_status_id)
+                SELECT pg_current_xact_id()::text::bigint, c.*
+                FROM ({changes}) c;
+                IF FOUND THEN
+                    -- Identical notifications are merged, so one per transaction
+                    PERFORM pg_notify('task_changes', '');
+                END IF;
+                RETURN NULL;
+            END
+            $$
+        """)
+        op.execute(f"""
+            CREATE TRIGGER task_changes_{event} AFTER {event.upper()} ON tasks
+            REFERENCING {TRANSITION_TABLES[event]}
+            FOR EACH STATEMENT EXECUTE FUNCTION task_changes_after_{event}()
+        """)
+
+
+def downgrade() -> None:
+    for event in CHANGES:
+        op.execute(f"DROP TRIGGER task_changes_{event} ON tasks")
+        op.execute(f"DROP FUNCTION task_changes_after_{event}()")
+    op.drop_table('task_changes')
@@ -0,0 +1,29 @@
+"""add trigram indexes to users
+
+Revision ID: 8d4f0a6b3c21
+Revises: 5b1e7c2d9a40
+Create Date: 2026-10-17 10:03:48.215630
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4f0a6b3c21'
+down_revision = '5b1e7c2d9a40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_users_email_trgm', 'users', ['email'],
+                    postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'})
+    op.create_index('ix_users_username_trgm', 'users', ['username'],
+                    postgresql_using='gin', postgresql_ops={'username': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_username_trgm', table_name='users')
+    op.drop_index('ix_users_email_trgm', table_name='users')
+    # The pg_trgm extension is left installed; other objects may depend on it
@@ -0,0 +1,112 @@
+"""add task counter tables
+
+Revision ID: c7a93e15f0b8
+Revises: 8d4f0a6b3c21
+Create Date: 2026-10-17 10:41:19.530871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7a93e15f0b8'
+down_revision = '8d4f0a6b3c21'
+branch_labels = None
+depends_on = None
+
+
+# Statement-level triggers see every changed row at once through transition
+# tables, so a bulk write adjusts each counter once instead of once per row.
+# Each source yields (status_id, user_id, delta) rows for one kind of statement.
+DELTAS = {
+    'insert': "SELECT status_id, user_id, 1 AS delta FROM new_rows",
+    'delete': "SELECT status_id, user_id, -1 AS delta FROM old_rows",
+    'update': ("SELECT status_id, user_id, 1 AS delta FROM new_rows "
+               "UNION ALL SELECT status_id, user_id, -1 FROM old_rows"),
+}
+
+# Counters are touched in key order so concurrent statements lock them in the
+# same order and cannot deadlock on each other
+UPSERT = """
+    INSERT INTO {table} AS c ({key}, task_count)
+    SELECT {key}, sum(delta) FROM ({deltas}) d
+    GROUP BY {key} HAVING sum(delta) <> 0 ORDER BY {key}
+    ON CONFLICT ({key}) DO UPDATE SET task_count = c.task_count + EXCLUDED.task_count;
+"""
+
+# Deletes only decrement existing counters: when a user is deleted its counter
+# row is cascaded away before this trigger runs, and must not be re-created
+DECREMENT = """
+    UPDATE {table} c SET task_count = c.task_count + d.delta
+    FROM (SELECT {key}, sum(delta) AS delta FROM ({deltas}) d GROUP BY {key}) d
+    WHERE c.{key} = d.{key};
+"""
+
+COUNTERS = (
+    ('task_counts_by_status', 'status_id'),
+    ('task_counts_by_user', 'user_id'),
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'task_counts_by_status',
+        sa.Column('status_id', sa.Integer(), sa.ForeignKey('status.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('task_count', sa.BigInteger(), nullable=False, server_default='0'),
+    )
+    op.create_table(
+        'task_counts_by_user',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('task_count', sa.BigInteger(), nullable=False, server_default='0'),
+    )
+
+    for event, deltas in DELTAS.items():
+        template = DECREMENT if event == 'delete' else UPSERT
+        body = "".join(template.format(table=table, key=key, deltas=deltas) for table, key in COUNTERS)
+        op.execute(f"""
+            CREATE FUNCTION task_counts_after_{event}() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                {body}
+                RETURN NULL;
+            END
+            $$
+        """)
+
+    # Transition tables cannot be combined with an UPDATE OF column list, so the
+    # update trigger fires for every UPDATE; rows whose status and owner did not
+    # change net to zero and are skipped
+    op.execute("""
+        CREATE TRIGGER task_counts_insert AFTER INSERT ON tasks
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION task_counts_after_insert()
+    """)
+    op.execute("""
+        CREATE TRIGGER task_counts_update AFTER UPDATE ON tasks
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION task_counts_after_update()
+    """)
+    op.execute("""
+        CREATE TRIGGER task_counts_delete AFTER DELETE ON tasks
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION task_counts_after_delete()
+    """)
+
+    # Backfill with writers blocked so no change slips between the count and the triggers
+    op.execute("LOCK TABLE tasks IN SHARE MODE")
+    op.execute("""
+        INSERT INTO task_counts_by_status (status_id, task_count)
+        SELECT status_id, count(*) FROM tasks GROUP BY status_id
+    """)
+    op.execute("""
+        INSERT INTO task_counts_by_user (user_id, task_count)
+        SELECT user_id, count(*) FROM tasks GROUP BY user_id
+    """)
+
+
+def downgrade() -> None:
+    for event in DELTAS:
+        op.execute(f"DROP TRIGGER task_counts_{event} ON tasks")
+        op.execute(f"DROP FUNCTION task_counts_after_{event}()")
+    op.drop_table('task_counts_by_user')
+    op.drop_table('task_counts_by_status')
@@ -0,0 +1,44 @@
+"""add search_vector to tasks
+
+Revision ID: ffb0b1b754fb
+Revises: c7a93e15f0b8
+Create Date: 2026-10-17 11:26:52.118304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'ffb0b1b754fb'
+down_revision = 'c7a93e15f0b8'
+branch_labels = None
+depends_on = None
+
+
+# Title words weigh more than description words when ranking. The text search
+# configuration is spelled out so the expression is immutable, as a generated
+# column requires, and matches the one used by /tasks/search.
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english'::regconfig, title), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    # Stored generated column: Postgres keeps it in sync with title and
+    # description. Adding it rewrites tasks once, holding an exclusive lock
+    # for the duration, so run this outside peak hours on large tables.
+    op.add_column('tasks', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(SEARCH_VECTOR, persisted=True),
+        nullable=False,
+    ))
+    op.create_index('ix_tasks_search_vector', 'tasks', ['search_vector'], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tasks_search_vector', table_name='tasks')
+    op.drop_column('tasks', 'search_vector')
@@ -0,0 +1,5 @@
+import os
+
+# Keep the counters and cache generations the tests bump away from a dev
+# server running against the same database; set before app.shm is imported
+os.environ.setdefault("SHM_NAMESPACE", "task-api-tests")
@@ -0,0 +1,61 @@
+import base64
+import json
+from collections import namedtuple
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+
+from app import models
+from app.pagination import decode_cursor, encode_cursor, keyset_filter, split_page
+
+Row = namedtuple("Row", ["id", "title"])
+ORDERING = [(models.Task.title, False), (models.Task.id, False)]
+
+
+def sql(clause) -> str:
+    return str(clause.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def test_cursor_round_trip():
+    values = [0.4375, "deploy the server", 42]
+    cursor = encode_cursor("tasks:search", values)
+
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+    assert decode_cursor(cursor, "tasks:search", 3) == values
+
+
+@pytest.mark.parametrize("cursor, key, size", [
+    (encode_cursor("users:id", [1]), "tasks:id", 1),  # another route's cursor
+    (encode_cursor("tasks:id", [1]), "tasks:id", 2),  # another ordering
+    ("not a cursor", "tasks:id", 1),
+    (base64.urlsafe_b64encode(b"not json").decode(), "tasks:id", 1),
+    (base64.urlsafe_b64encode(json.dumps([1, 2]).encode()).decode(), "tasks:id", 1),
+    (base64.urlsafe_b64encode(json.dumps({"k": "tasks:id", "v": 1}).encode()).decode(), "tasks:id", 1),
+])
+def test_bad_cursor_is_a_400(cursor, key, size):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, key, size)
+    assert error.value.status_code == 400
+
+
+def test_split_page_cursor_points_after_last_row():
+    rows = [Row(i, f"task {i}") for i in range(1, 5)]
+
+    page, cursor = split_page(rows, ORDERING, "tasks:title", 3)
+    assert page == rows[:3]
+    assert decode_cursor(cursor, "tasks:title", 2) == ["task 3", 3]
+
+    page, cursor = split_page(rows[3:], ORDERING, "tasks:title", 3)
+    assert page == rows[3:] and cursor is None
+
+
+def test_keyset_filter_uses_row_comparison_for_one_direction():
+    assert sql(keyset_filter(ORDERING, ["a", 7])) == "(tasks.title, tasks.id) > ('a', 7)"
+    descending = [(column, True) for column, _ in ORDERING]
+    assert sql(keyset_filter(descending, ["a", 7])) == "(tasks.title, tasks.id) < ('a', 7)"
+
+
+def test_keyset_filter_mixed_directions():
+    ordering = [(models.Task.title, True), (models.Task.id, False)]
+    assert sql(keyset_filter(ordering, ["a", 7])) == "tasks.title < 'a' OR tasks.title = 'a' AND tasks.id > 7"
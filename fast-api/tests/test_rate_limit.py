@@ -0,0 +1,87 @@
+import pytest
+
+from app.rate_limit import EVICT_BATCH, MemoryBackend, RateLimiter, SharedMemoryBackend
+
+PERIOD = 60
+# Start of window 10
+T0 = 10 * PERIOD
+
+
+@pytest.fixture(params=["memory", "shared"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend(max_clients=1000)
+    return SharedMemoryBackend(path=str(tmp_path / "ratelimit"), slots=64)
+
+
+def test_blocks_after_calls_with_retry_after(backend):
+    limiter = RateLimiter(calls=3, period=PERIOD, backend=backend)
+
+    assert [limiter.hit("10.0.0.1", T0 + 1) for _ in range(3)] == [None, None, None]
+    assert limiter.hit("10.0.0.1", T0 + 15) == 45
+    # Other clients have their own budget
+    assert limiter.hit("10.0.0.2", T0 + 15) is None
+
+
+def test_previous_window_weighs_by_overlap(backend):
+    limiter = RateLimiter(calls=3, period=PERIOD, backend=backend)
+    for _ in range(3):
+        limiter.hit("client", T0)
+
+    # Halfway through the next window the previous one still counts 3 * 0.5
+    now = T0 + PERIOD * 1.5
+    assert [limiter.hit("client", now) for _ in range(2)] == [None, None]
+    assert limiter.hit("client", now) == pytest.approx(30)
+
+
+def test_budget_resets_after_an_idle_window(backend):
+    limiter = RateLimiter(calls=3, period=PERIOD, backend=backend)
+    for _ in range(4):
+        limiter.hit("client", T0)
+
+    # Two windows later nothing of window 10 overlaps the sliding period
+    assert [limiter.hit("client", T0 + 2 * PERIOD) for _ in range(3)] == [None, None, None]
+
+
+def test_memory_backend_caps_tracked_clients():
+    backend = MemoryBackend(max_clients=5)
+    limiter = RateLimiter(calls=3, period=PERIOD, backend=backend)
+
+    for i in range(20):
+        limiter.hit(f"client-{i}", T0)
+    assert list(backend.clients) == [f"client-{i}" for i in range(15, 20)]
+
+
+def test_memory_backend_evicts_idle_clients():
+    backend = MemoryBackend(max_clients=1000)
+    limiter = RateLimiter(calls=3, period=PERIOD, backend=backend)
+    for i in range(EVICT_BATCH + 2):
+        limiter.hit(f"idle-{i}", T0)
+
+    limiter.hit("new", T0 + 5 * PERIOD)
+    assert list(backend.clients) == ["idle-8", "idle-9", "new"]
+
+
+def test_shared_backend_reuses_the_slot_idle_longest(tmp_path):
+    # One group of 8 slots, so every key competes for the same slots
+    backend = SharedMemoryBackend(path=str(tmp_path / "ratelimit"), slots=SharedMemoryBackend.WAYS)
+    limiter = RateLimiter(calls=1, period=PERIOD, backend=backend)
+    for i in range(8):
+        assert limiter.hit(f"client-{i}", T0) is None
+    for i in range(1, 8):
+        assert limiter.hit(f"client-{i}", T0 + PERIOD) is not None
+
+    # client-0 was idle longest, so the newcomer takes its slot
+    assert limiter.hit("client-8", T0 + PERIOD) is None
+    assert all(limiter.hit(f"client-{i}", T0 + PERIOD) is not None for i in range(1, 9))
+    assert (tmp_path / "ratelimit").stat().st_size == 8 * SharedMemoryBackend.SLOT.size
+
+
+def test_shared_backend_is_one_budget_per_file(tmp_path):
+    path = str(tmp_path / "ratelimit")
+    first = RateLimiter(calls=2, period=PERIOD, backend=SharedMemoryBackend(path=path, slots=64))
+    second = RateLimiter(calls=2, period=PERIOD, backend=SharedMemoryBackend(path=path, slots=64))
+
+    assert first.hit("client", T0) is None
+    assert second.hit("client", T0) is None
+    assert first.hit("client", T0) is not None
@@ -0,0 +1,118 @@
+import time
+from email.utils import formatdate
+from types import SimpleNamespace
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.response_cache import ResponseCache, cached, invalidates, response_cache
+from app.status_cache import status_cache
+
+ORIGIN = "https://ui.example.com"
+
+
+def cache_app(cache: ResponseCache) -> TestClient:
+    """A database-free app with one cached and one invalidating route"""
+    test_app = FastAPI()
+
+    @test_app.middleware("http")
+    async def response_cache_middleware(request: Request, call_next):
+        return await cache.handle(request, call_next)
+
+    @test_app.get("/items/{size}", dependencies=[cached("tasks")])
+    def get_items(size: int):
+        return {"items": "x" * size}
+
+    @test_app.post("/items", dependencies=[invalidates("tasks")])
+    def create_item():
+        return {}
+
+    return TestClient(test_app)
+
+
+def test_cached_responses_keep_cors_headers():
+    # Serve /statuses from memory; the test needs no database
+    status_cache.load([(1, "new"), (2, "in progress"), (3, "completed")])
+    response_cache.invalidate(["statuses"])
+    client = TestClient(app)
+
+    for expected in ("MISS", "HIT"):
+        response = client.get("/statuses", headers={"Origin": ORIGIN})
+        assert response.status_code == 200
+        assert response.headers["x-cache"] == expected
+        assert response.headers["access-control-allow-origin"] == "*"
+        assert response.headers["access-control-allow-credentials"] == "true"
+        assert "x-next-cursor" in response.headers["access-control-expose-headers"].lower()
+
+
+def test_writes_invalidate_their_tags_only():
+    cache = ResponseCache()
+    client = cache_app(cache)
+
+    assert client.get("/items/10").headers["x-cache"] == "MISS"
+    assert client.get("/items/10").headers["x-cache"] == "HIT"
+    cache.invalidate(["users"])
+    assert client.get("/items/10").headers["x-cache"] == "HIT"
+
+    client.post("/items")
+    response = client.get("/items/10")
+    assert response.headers["x-cache"] == "MISS"
+    assert response.json() == {"items": "x" * 10}
+    assert cache.stats()["stale"] == 1
+
+
+def test_if_none_match_gets_a_304():
+    client = cache_app(ResponseCache())
+    etag = client.get("/items/10").headers["etag"]
+
+    for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = client.get("/items/10", headers={"If-None-Match": if_none_match})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    assert client.get("/items/10", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_if_modified_since_gets_a_304(monkeypatch):
+    cache = ResponseCache()
+    client = cache_app(cache)
+    cache.invalidate(["tasks"])
+    # Last-Modified is only advertised once its second is over
+    monkeypatch.setattr("app.response_cache.time", SimpleNamespace(time=lambda: time.time() + 2))
+
+    last_modified = client.get("/items/10").headers["last-modified"]
+    response = client.get("/items/10", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+    assert response.headers["last-modified"] == last_modified
+
+    earlier = formatdate(time.time() - 3600, usegmt=True)
+    assert client.get("/items/10", headers={"If-Modified-Since": earlier}).status_code == 200
+    # If-None-Match wins over If-Modified-Since
+    headers = {"If-Modified-Since": last_modified, "If-None-Match": '"other"'}
+    assert client.get("/items/10", headers=headers).status_code == 200
+
+
+def test_entries_over_the_size_limit_are_not_stored():
+    cache = ResponseCache(max_entry_bytes=100)
+    client = cache_app(cache)
+
+    assert [client.get("/items/200").headers["x-cache"] for _ in range(2)] == ["MISS", "MISS"]
+    assert [client.get("/items/10").headers["x-cache"] for _ in range(2)] == ["MISS", "HIT"]
+    assert cache.stats()["uncacheable"] == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    # Room for two of the ~110 byte bodies
+    cache = ResponseCache(max_bytes=250)
+    client = cache_app(cache)
+    client.get("/items/100")
+    client.get("/items/101")
+    client.get("/items/100")
+
+    client.get("/items/102")
+    assert client.get("/items/100").headers["x-cache"] == "HIT"
+    assert client.get("/items/101").headers["x-cache"] == "MISS"
+    assert cache.stats()["evictions"] == 2
+    assert cache.stats()["bytes"] <= 250